@@ -9,7 +9,11 @@ from dotenv import load_dotenv
 from styles import load_custom_css
 from tts import show_available_voices
 from gemini_client import initialize_gemini
-from data_loader import load_all_csv_data, load_word_master
+from data_loader import load_catalog
+from components import card_cache_stats
+from audio_cache import get_audio_cache
+import profiling
+from prefetch import cancel_prefetch
 from tabs import word_learning_tab, shadowing_tab, progress_tab, create_sample_data
 
 load_dotenv()
@@ -45,6 +49,7 @@ def initialize_session_state():
 
 
 def main():
+    profiling.begin_run("app")
     load_custom_css()
     initialize_session_state()
     initialize_gemini()
@@ -82,10 +87,11 @@ def main():
 
         st.markdown("## 📊 データ状況")
 
-    df = load_all_csv_data()
-    word_master = load_word_master()
+    # 起動時は軽量カタログだけを読む（本文はタブ側で必要な範囲だけ読み込む）
+    with profiling.region("data"):
+        catalog = load_catalog()
 
-    if df.empty:
+    if catalog.empty:
         st.error("📁 CSVファイルが見つかりません。'data'フォルダにgroup*.csvファイルを配置してください。")
         if st.button("🔧 サンプルデータを作成"):
             create_sample_data()
@@ -93,17 +99,31 @@ def main():
         return
 
     with st.sidebar:
-        st.markdown(f"**📈 統計:** {len(df)}文 / {df['group_id'].nunique()}グループ")
+        st.markdown(f"**📈 統計:** {len(catalog)}文 / {len(catalog.groups)}グループ")
         st.markdown(f"**📚 今日:** {st.session_state.studied_today}文章学習")
 
-    tab1, tab2, tab3 = st.tabs(["📚 学習", "🎯 シャドーイング", "📊 記録"])
-
-    with tab1:
-        word_learning_tab(df, word_master)
-    with tab2:
-        shadowing_tab()
-    with tab3:
-        progress_tab(df)
+    # st.tabs は非表示のタブも毎回実行するので、選択中のビューだけを実行する
+    views = {
+        "📚 学習": ("learn", lambda: word_learning_tab(catalog)),
+        "🎯 シャドーイング": ("shadowing", shadowing_tab),
+        "📊 記録": ("progress", lambda: progress_tab(catalog)),
+    }
+    active_view = st.segmented_control(
+        "表示",
+        options=list(views),
+        default="📚 学習",
+        key="active_view",
+        label_visibility="collapsed",
+    ) or "📚 学習"
+
+    name, render_view = views[active_view]
+    if name == "progress":
+        # 先読みしない画面に移ったら、学習・シャドーイングで予定した先読みを取り消す
+        cancel_prefetch()
+    with profiling.region(f"tab:{name}"):
+        render_view()
+
+    profiling.show_timings(caches={"card cache": card_cache_stats(), "audio cache": get_audio_cache().stats()})
 
 
 if __name__ == "__main__":
@@ -0,0 +1,236 @@
+"""
+静的アセットのビルドと URL 解決
+
+    python assets.py [--data-dir data] [--fonts-dir fonts] [--cdn-fonts]
+
+static/ の CSS・JS を内容のハッシュ付きファイル名で static/dist/ に書き出し、
+対応表を static/dist/assets.json に残す。fonts/ のフォントの元ファイル（FONTS、入手先は fonts/README.md）から
+コーパスに出てくる文字だけのサブセット（woff2、brotli が無ければ woff）を作って同じ場所に置き、
+その @font-face をバンドルした CSS に付ける（外部の CDN を使わないので、オフラインの端末でも表示が崩れない）。
+元ファイルか fontTools が欠けていればエラーで止まる（黙って CDN に頼ったりフォント抜きにしたりしない）。
+Google Fonts から読み込ませてよい環境では --cdn-fonts を付けると、サブセットの代わりに Google Fonts の @import を付ける。
+ビルドしていない static/ の元の CSS はどちらも持たず、Georgia などの代わりのフォントで表示する。
+
+ファイル名が内容で決まるので、static/dist/ は長期キャッシュしてよい。Streamlit の静的配信は
+Cache-Control を付けないため、前段のプロキシで
+  /app/static/dist/  →  Cache-Control: public, max-age=31536000, immutable
+を付ける。ビルドしていない環境では static/ の元ファイルを ?v=<ハッシュ> 付きで参照する。
+"""
+import argparse
+import functools
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+from utils.utils import write_atomic
+
+_BASE_DIR = Path(__file__).resolve().parent
+# .streamlit/config.toml の enableStaticServing により static/ は /app/static/ で配信される
+STATIC_DIR = _BASE_DIR / "static"
+STATIC_URL = "app/static"
+DIST_DIRNAME = "dist"
+ASSET_MANIFEST = "assets.json"
+FONTS_DIR = _BASE_DIR / "fonts"
+
+# バンドルする static/ のファイル
+BUNDLED_FILES = ("app.css", "flip_card.css", "flip_card.js")
+# 自前で配信するフォント: (family, weight, 元ファイル名, 文字集合)
+FONTS = (
+    ("Source Serif 4", 400, "SourceSerif4-Regular.ttf", "latin"),
+    ("Source Serif 4", 500, "SourceSerif4-Medium.ttf", "latin"),
+    ("Noto Sans JP", 400, "NotoSansJP-Regular.ttf", "japanese"),
+    ("Noto Sans JP", 500, "NotoSansJP-Medium.ttf", "japanese"),
+)
+# カードや画面に固定で出る文字（コーパスに無くてもサブセットに含める）
+_UI_TEXT = "English 日本語 tap to translate return"
+# FONTS のファミリーを使う CSS（@font-face か --cdn-fonts の @import をここに入れる）
+FONT_CSS_FILES = ("flip_card.css",)
+_GOOGLE_FONTS_IMPORT = (
+    "@import url('https://fonts.googleapis.com/css2?family=Source+Serif+4:wght@400;500"
+    "&family=Noto+Sans+JP:wght@400;500&display=swap');\n"
+)
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+
+
+def _content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _hashed_name(name, data):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{_content_hash(data)}{ext}"
+
+
+def dist_dir(static_dir=STATIC_DIR):
+    return Path(static_dir) / DIST_DIRNAME
+
+
+def read_asset_manifest(static_dir=STATIC_DIR):
+    """ビルド済みアセットの対応表（元の名前 → static/dist/ 内のファイル名）。未ビルドなら空"""
+    try:
+        return json.loads((dist_dir(static_dir) / ASSET_MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def corpus_characters(data_dir="data"):
+    """
+    フォントのサブセットに含める文字
+    latin は英文（と ASCII）、japanese は和訳・単語の意味（と ASCII）に出てくる文字。
+    """
+    import corpus
+
+    view = corpus.load_corpus_view(data_dir)
+    ascii_chars = "".join(chr(c) for c in range(0x20, 0x7F))
+    latin = set(ascii_chars + _UI_TEXT + "‘’“”–—…")
+    japanese = set(ascii_chars + _UI_TEXT + "、。，．・「」『』（）！？：；〜ー")
+    for row in range(len(view)):
+        latin.update(view.value("sentence_content_en", row) or "")
+        japanese.update(view.value("translated_sentence", row) or "")
+    table = view.word_table
+    for word_id in range(len(table)):
+        if word_id in table:
+            latin.update(table.word(word_id) or "")
+            for meaning in table.meanings_of(word_id):
+                japanese.update(meaning)
+    return {"latin": "".join(sorted(latin)), "japanese": "".join(sorted(japanese))}
+
+
+def subset_font(source, text):
+    """フォントを text の文字だけに絞る（fontTools が必要）。(バイト列, 拡張子) を返す"""
+    from fontTools import subset
+
+    options = subset.Options()
+    options.flavor = "woff2" if importlib.util.find_spec("brotli") else "woff"
+    options.layout_features = ["*"]
+    font = subset.load_font(str(source), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text=text)
+    subsetter.subset(font)
+    tmp = tempfile.NamedTemporaryFile(suffix=f".{options.flavor}", delete=False)
+    tmp.close()
+    try:
+        subset.save_font(font, tmp.name, options)
+        return Path(tmp.name).read_bytes(), options.flavor
+    finally:
+        os.unlink(tmp.name)
+
+
+def _font_face(family, weight, filename, flavor):
+    return (
+        f"@font-face{{font-family:'{family}';font-style:normal;font-weight:{weight};font-display:swap;"
+        f"src:url('{filename}') format('{flavor}');}}\n"
+    )
+
+
+def _bundle_css(source_css, font_css=""):
+    """コメントと空行を落とし、font_css（@font-face か @import）を先頭に付ける"""
+    css = font_css + _CSS_COMMENT.sub("", source_css)
+    return "\n".join(line.strip() for line in css.splitlines() if line.strip()) + "\n"
+
+
+def build_assets(data_dir="data", fonts_dir=FONTS_DIR, static_dir=STATIC_DIR, cdn_fonts=False, log=print):
+    """
+    static/dist/ にハッシュ付きのアセットを書き出して対応表を返す
+    フォントの元ファイルが足りなければ FileNotFoundError、fontTools が無ければ RuntimeError。
+    cdn_fonts=True なら自前フォントを作らず、CSS の Google Fonts の @import を残す。
+    """
+    static_dir = Path(static_dir)
+    out_dir = dist_dir(static_dir)
+    manifest = {"fonts": [], "sources": {}}
+
+    fonts = [(family, weight, Path(fonts_dir) / name, charset) for family, weight, name, charset in FONTS]
+    if not cdn_fonts:
+        missing = [source.name for _, _, source, _ in fonts if not source.exists()]
+        if missing:
+            raise FileNotFoundError(
+                f"font sources missing from {fonts_dir}: {', '.join(missing)} "
+                "(see fonts/README.md, or pass --cdn-fonts to keep the Google Fonts import)"
+            )
+        if importlib.util.find_spec("fontTools") is None:
+            raise RuntimeError("fontTools is not installed (pip install fonttools brotli)")
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    font_css = ""
+    if cdn_fonts:
+        font_css = _GOOGLE_FONTS_IMPORT
+        log("--cdn-fonts: fonts are loaded from fonts.googleapis.com")
+    else:
+        charsets = corpus_characters(data_dir)
+        for family, weight, source, charset in fonts:
+            data, flavor = subset_font(source, charsets[charset])
+            filename = _hashed_name(f"{source.stem}.{flavor}", data)
+            write_atomic(out_dir / filename, data)
+            font_css += _font_face(family, weight, filename, flavor)
+            manifest["fonts"].append(filename)
+            log(f"{source.name}: {len(charsets[charset])} chars -> {filename} ({len(data):,} B)")
+
+    for name in BUNDLED_FILES:
+        source = (static_dir / name).read_bytes()
+        manifest["sources"][name] = _content_hash(source)
+        text = source.decode("utf-8")
+        if name.endswith(".css"):
+            text = _bundle_css(text, font_css if name in FONT_CSS_FILES else "")
+        data = text.encode("utf-8")
+        manifest[name] = _hashed_name(name, data)
+        write_atomic(out_dir / manifest[name], data)
+        log(f"{name} -> {manifest[name]} ({len(data):,} B)")
+
+    # 古いハッシュのファイルを消す
+    keep = {*manifest["fonts"], *(manifest[name] for name in BUNDLED_FILES), ASSET_MANIFEST}
+    for path in out_dir.iterdir():
+        if path.name not in keep and not path.name.startswith("."):
+            path.unlink()
+    write_atomic(out_dir / ASSET_MANIFEST, json.dumps(manifest, indent=2).encode("utf-8"))
+    return manifest
+
+
+@functools.lru_cache(maxsize=4)
+def _asset_urls(manifest_mtime_ns):
+    manifest = read_asset_manifest()
+    urls = {}
+    for name in BUNDLED_FILES:
+        source_hash = _content_hash((STATIC_DIR / name).read_bytes())
+        built = manifest.get(name)
+        # 元ファイルがビルド後に編集されていたら、古いバンドルではなく元ファイルを使う
+        if built and manifest.get("sources", {}).get(name) == source_hash and (dist_dir() / built).exists():
+            urls[name] = f"{STATIC_URL}/{DIST_DIRNAME}/{built}"
+        else:
+            urls[name] = f"{STATIC_URL}/{name}?v={source_hash}"
+    return urls
+
+
+def asset_urls():
+    """
+    アプリのルートからの相対 URL（名前 → URL）
+    ビルド済みなら static/dist/ のハッシュ付きファイル、未ビルドか元ファイルの方が新しければ
+    static/ の元ファイルに ?v=<ハッシュ> を付ける。対応表の mtime ごとに覚えるので、
+    実行中にビルドし直しても再起動は要らない。
+    """
+    try:
+        mtime_ns = (dist_dir() / ASSET_MANIFEST).stat().st_mtime_ns
+    except OSError:
+        mtime_ns = 0
+    return _asset_urls(mtime_ns)
+
+
+def asset_url(name):
+    return asset_urls()[name]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CSS・JS・フォントをハッシュ付きで static/dist/ に書き出す")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--fonts-dir", default=str(FONTS_DIR))
+    parser.add_argument("--cdn-fonts", action="store_true", help="自前フォントを作らず Google Fonts の @import を残す")
+    args = parser.parse_args()
+    sys.path.insert(0, str(_BASE_DIR))
+    try:
+        build_assets(args.data_dir, args.fonts_dir, cdn_fonts=args.cdn_fonts)
+    except (FileNotFoundError, RuntimeError) as e:
+        sys.exit(f"error: {e}")
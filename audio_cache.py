@@ -0,0 +1,239 @@
+"""
+合成済み音声のディスクキャッシュ（内容アドレス）
+キーは (本文, エンジン, 声, 速度, 形式) の SHA-256 で、<キー>.<拡張子> として保存する。
+書き込みは一時ファイル経由の置き換えで、容量が AUDIO_CACHE_MB を超えたら最後に使われた時刻
+（ヒット時に mtime を更新する）の古いものから消す。合成サービスのワーカーとアプリのプロセスが
+同じディレクトリに書くので、容量はディレクトリを走査した合計で判定する（プロセスごとの合計ではない）。
+
+既定の置き場所は static/audio/ で、Streamlit の静的配信により app/static/audio/<キー>.<拡張子> で
+そのまま取得できる（Range・ETag・Last-Modified にも対応）。Content-Type を拡張子から付けるのは
+requirements.txt の版（1.65）以降で、.wav は audio/x-wav、.mp3 は audio/mpeg、.ogg/.opus は audio/ogg、
+配信の index.json は application/json になる。1.40 などの古い版は画像と PDF 以外を text/plain と
+X-Content-Type-Options: nosniff で返すので、ブラウザは再生しない。
+ファイル名が内容で決まるので、前段のプロキシで
+  /app/static/audio/  →  Cache-Control: public, max-age=31536000, immutable
+を付けてよい。ENVOCAB_AUDIO_CACHE_DIR を static/ の外にすると URL は返さない（url() が None）。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from assets import STATIC_DIR, STATIC_URL
+from utils.utils import write_atomic
+
+AUDIO_CACHE_DIR = Path(os.getenv("ENVOCAB_AUDIO_CACHE_DIR", STATIC_DIR / "audio"))
+AUDIO_CACHE_MB = float(os.getenv("ENVOCAB_AUDIO_CACHE_MB", "512"))
+# このプロセスが予算のこの割合を書くたびにディレクトリを走査し直す（各プロセスの超過はこの分まで）
+SCAN_FRACTION = 1 / 64
+# 書き込み中に落ちたプロセスが残した一時ファイル（.<キー>.*）を走査のときに消すまでの時間（秒）
+STALE_TEMP_SECONDS = 3600
+
+MIME_TYPES = {
+    "wav": "audio/wav",
+    "mp3": "audio/mpeg",
+    "ogg": "audio/ogg",
+    "opus": "audio/ogg",
+}
+
+
+def audio_key(text, engine, voice, rate, fmt):
+    """音声を決める要素からキャッシュキーを作る"""
+    payload = json.dumps([text.strip(), engine, voice, round(float(rate), 3), fmt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def static_url(path):
+    """static/ 内のファイルのアプリのルートからの相対 URL（static/ の外なら None）"""
+    try:
+        relative = Path(path).resolve().relative_to(STATIC_DIR.resolve())
+    except ValueError:
+        return None
+    return f"{STATIC_URL}/{relative.as_posix()}"
+
+
+class AudioCache:
+    """
+    サイズ上限付きの音声ファイルキャッシュ（スレッドセーフ）
+    起動時にディレクトリを走査して索引を作り、以後は索引で引く。
+    別プロセス（合成サービスのワーカー・一括合成）が書いたファイルは、索引に無ければディスクを見て取り込む。
+    予算の SCAN_FRACTION を書くたび（と索引の合計が予算を超えたとき）にディレクトリを走査し直し、
+    全プロセスが書いた分の合計と mtime で古いものから消す。
+    """
+
+    def __init__(self, root=AUDIO_CACHE_DIR, budget_bytes=int(AUDIO_CACHE_MB * 1024 * 1024)):
+        self.root = Path(root)
+        self.budget_bytes = budget_bytes
+        self._lock = threading.Lock()
+        self._index = {}  # key -> [ファイル名, サイズ, 最終使用時刻]
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self._scan_every = max(1, int(budget_bytes * SCAN_FRACTION))
+        self._unscanned = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._scan_locked()
+
+    def _scan_locked(self):
+        """ディレクトリを走査して索引と合計サイズを作り直す（他のプロセスが書いた・消したファイルも反映する）"""
+        index, size = {}, 0
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    self._remove_stale_temp(entry)
+                    continue
+                key, _, ext = entry.name.partition(".")
+                if ext not in MIME_TYPES or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                index[key] = [entry.name, stat.st_size, stat.st_mtime]
+                size += stat.st_size
+        self._index, self.size = index, size
+        self._unscanned = 0
+
+    @staticmethod
+    def _remove_stale_temp(entry):
+        try:
+            if entry.is_file() and time.time() - entry.stat().st_mtime > STALE_TEMP_SECONDS:
+                os.unlink(entry.path)
+        except OSError:
+            pass
+
+    def _adopt(self, path):
+        key, _, ext = path.name.partition(".")
+        if ext not in MIME_TYPES or not path.is_file():
+            return None
+        stat = path.stat()
+        entry = [path.name, stat.st_size, stat.st_mtime]
+        old = self._index.get(key)
+        if old is not None:
+            self.size -= old[1]
+        self._index[key] = entry
+        self.size += stat.st_size
+        return entry
+
+    def _lookup_locked(self, key):
+        entry = self._index.get(key)
+        if entry is not None and (self.root / entry[0]).exists():
+            return entry
+        if entry is not None:
+            self._index.pop(key)
+            self.size -= entry[1]
+        for ext in MIME_TYPES:
+            path = self.root / f"{key}.{ext}"
+            if path.exists():
+                return self._adopt(path)
+        return None
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._lookup_locked(key) is not None
+
+    def size_of(self, key):
+        """キャッシュ済みならファイルのバイト数（使用時刻は変えない）、無ければ None"""
+        with self._lock:
+            entry = self._lookup_locked(key)
+            return None if entry is None else entry[1]
+
+    def path(self, key):
+        """キャッシュ済みならファイルのパス（使用時刻を更新する）、無ければ None"""
+        with self._lock:
+            entry = self._lookup_locked(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            path = self.root / entry[0]
+            try:
+                os.utime(path)
+                entry[2] = path.stat().st_mtime
+            except OSError:
+                pass
+            return path
+
+    def url(self, key):
+        """キャッシュ済みならアプリのルートからの相対 URL（static/ の外に置いているときは None）"""
+        path = self.path(key)
+        return None if path is None else static_url(path)
+
+    def read(self, path):
+        """path() が返したファイルを (バイト列, MIMEタイプ) で読む"""
+        data = path.read_bytes()
+        with self._lock:
+            self.bytes_read += len(data)
+        return data, MIME_TYPES[path.suffix[1:]]
+
+    def get(self, key):
+        """(バイト列, MIMEタイプ)、無ければ None"""
+        path = self.path(key)
+        if path is None:
+            return None
+        try:
+            return self.read(path)
+        except OSError:
+            return None
+
+    def put(self, key, data, ext):
+        """音声を保存してパスを返す（同じキーは上書き）"""
+        if ext not in MIME_TYPES:
+            raise ValueError(f"unsupported audio format: {ext}")
+        path = self.root / f"{key}.{ext}"
+        write_atomic(path, data)
+        with self._lock:
+            self.bytes_written += len(data)
+            self._adopt(path)
+            self._unscanned += len(data)
+            if self._unscanned >= self._scan_every or self.size > self.budget_bytes:
+                self._scan_locked()
+            self._evict_locked(keep=key)
+        return path
+
+    def _evict_locked(self, keep=None):
+        if self.size <= self.budget_bytes:
+            return
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1][2]):
+            if self.size <= self.budget_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                (self.root / entry[0]).unlink()
+            except FileNotFoundError:
+                pass
+            del self._index[key]
+            self.size -= entry[1]
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._index),
+                "size": self.size,
+                "max_size": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bytes_read": self.bytes_read,
+                "bytes_written": self.bytes_written,
+            }
+
+
+_lock = threading.Lock()
+_cache = None
+
+
+def get_audio_cache():
+    """プロセス全体で 1 つの音声キャッシュ"""
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = AudioCache()
+        return _cache
@@ -0,0 +1,174 @@
+"""
+合成した音声（16bit モノラルの PCM）をキャッシュ・配信用の形式にする符号化
+ENVOCAB_AUDIO_CODEC で選ぶ（既定の auto は CODEC_PREFERENCE のうち使える最初のもの）。
+  mp3                 : ffmpeg（PATH 上にあり、libmp3lame が組み込まれているとき）
+  mulaw               : µ-law（G.711）8bit の WAV。NumPy だけで動き、主要ブラウザで再生できる
+  opus / vorbis       : ffmpeg。mp3 より小さいが Ogg コンテナなので iOS Safari（iPhone SE）では
+                        再生が不安定。auto では選ばず、ENVOCAB_AUDIO_CODEC で明示したときだけ使う
+  pcm                 : 16bit の WAV（従来どおり、無圧縮）
+IMA ADPCM は Chrome・Firefox が WAV として再生できないので使わない。
+速度違いの音声は等速の PCM を伸縮して encode() する（非可逆な保存形式を decode() して作り直さない）。
+decode() は品質の計測（bench_audio_codecs.py）用。
+"""
+import functools
+import io
+import os
+import shutil
+import struct
+import subprocess
+import wave
+from collections import namedtuple
+
+import numpy as np
+
+AUDIO_CODEC = os.getenv("ENVOCAB_AUDIO_CODEC", "auto")
+# auto で選ぶ順（どのブラウザでも再生できる形式だけ）
+CODEC_PREFERENCE = ("mp3", "mulaw")
+
+# name はキャッシュキーに、ext は保存するファイルの拡張子（audio_cache.MIME_TYPES）に使う
+Codec = namedtuple("Codec", "name ext encode decode")
+
+_WAVE_FORMAT_MULAW = 7
+_MULAW_BIAS = 0x21
+_MULAW_CLIP = 8159
+# ffmpeg のエンコーダ名・出力形式・オプション
+_FFMPEG_ENCODERS = {
+    "opus": ("libopus", "ogg", ["-b:a", "24k", "-application", "voip"]),
+    "vorbis": ("libvorbis", "ogg", ["-q:a", "3"]),
+    "mp3": ("libmp3lame", "mp3", ["-b:a", "48k"]),
+}
+
+
+def pcm_to_wav(samples, sample_rate):
+    """int16 の配列を 16bit モノラルの WAV にする"""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(np.asarray(samples, dtype="<i2").tobytes())
+    return buf.getvalue()
+
+
+def wav_to_pcm(data):
+    """16bit PCM か µ-law のモノラル WAV を (int16 の配列, サンプルレート) にする"""
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("not a WAV file")
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id, size = struct.unpack_from("<4sI", data, pos)
+        body = data[pos + 8:pos + 8 + size]
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", body)
+        elif chunk_id == b"data" and fmt is not None:
+            tag, channels, sample_rate, _, _, bits = fmt
+            if channels != 1:
+                raise ValueError("expected mono WAV")
+            if tag == 1 and bits == 16:
+                return np.frombuffer(body, dtype="<i2").astype(np.int16), sample_rate
+            if tag == _WAVE_FORMAT_MULAW and bits == 8:
+                return mulaw_decode(np.frombuffer(body, dtype=np.uint8)), sample_rate
+            raise ValueError(f"unsupported WAV format {tag} ({bits} bit)")
+        pos += 8 + size + (size & 1)
+    raise ValueError("WAV has no data chunk")
+
+
+def mulaw_encode(samples):
+    """int16 の配列を G.711 µ-law（uint8）にする（上位 14bit を使う。audioop.lin2ulaw と同じ結果）"""
+    x = np.asarray(samples, dtype=np.int32) >> 2
+    negative = x < 0
+    magnitude = np.minimum(np.where(negative, -x, x), _MULAW_CLIP) + _MULAW_BIAS
+    segment = np.floor(np.log2(magnitude)).astype(np.int32) - 5
+    clipped = np.minimum(segment, 7)
+    code = np.where(segment > 7, 0x7F, (clipped << 4) | ((magnitude >> (clipped + 1)) & 0x0F))
+    return (code ^ np.where(negative, 0x7F, 0xFF)).astype(np.uint8)
+
+
+def mulaw_decode(codes):
+    """G.711 µ-law（uint8）を int16 の配列にする"""
+    u = ~np.asarray(codes, dtype=np.int32) & 0xFF
+    exponent = (u >> 4) & 0x07
+    magnitude = ((((u & 0x0F) << 3) + 0x84) << exponent) - 0x84
+    return np.where(u & 0x80, -magnitude, magnitude).astype(np.int16)
+
+
+def _mulaw_wav(samples, sample_rate):
+    codes = mulaw_encode(samples).tobytes()
+    fmt = struct.pack("<HHIIHHH", _WAVE_FORMAT_MULAW, 1, sample_rate, sample_rate, 1, 8, 0)
+    chunks = (
+        b"fmt " + struct.pack("<I", len(fmt)) + fmt
+        + b"fact" + struct.pack("<II", 4, len(codes))
+        + b"data" + struct.pack("<I", len(codes)) + codes + b"\0" * (len(codes) & 1)
+    )
+    return b"RIFF" + struct.pack("<I", 4 + len(chunks)) + b"WAVE" + chunks
+
+
+@functools.lru_cache(maxsize=1)
+def _ffmpeg_encoders():
+    """ffmpeg に組み込まれているエンコーダ名の集合（ffmpeg が無ければ空）"""
+    if shutil.which("ffmpeg") is None:
+        return frozenset()
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"], capture_output=True, text=True, timeout=10, check=True
+        )
+    except (OSError, subprocess.SubprocessError):
+        return frozenset()
+    return frozenset(line.split()[1] for line in result.stdout.splitlines() if len(line.split()) > 1)
+
+
+def _ffmpeg(args, data):
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", *args], input=data, capture_output=True, timeout=60
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+def _ffmpeg_codec(name):
+    encoder, container, options = _FFMPEG_ENCODERS[name]
+
+    def encode(samples, sample_rate):
+        pcm = np.asarray(samples, dtype="<i2").tobytes()
+        return _ffmpeg(
+            ["-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+             "-c:a", encoder, *options, "-f", container, "pipe:1"],
+            pcm,
+        )
+
+    def decode(data):
+        # Opus は 48kHz でしか復号されないので、どの形式も 48kHz で戻す（伸縮には影響しない）
+        pcm = _ffmpeg(["-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", "48000", "pipe:1"], data)
+        return np.frombuffer(pcm, dtype="<i2").astype(np.int16), 48000
+
+    ext = "opus" if name == "opus" else container
+    return Codec(name, ext, encode, decode)
+
+
+def available_codecs():
+    """この環境で使える形式の名前（auto の候補を優先順に、続けて明示したときだけ使う形式）"""
+    encoders = _ffmpeg_encoders()
+    names = [*CODEC_PREFERENCE, *(name for name in _FFMPEG_ENCODERS if name not in CODEC_PREFERENCE)]
+    names = [name for name in names if name not in _FFMPEG_ENCODERS or _FFMPEG_ENCODERS[name][0] in encoders]
+    return names + ["pcm"]
+
+
+def get_codec(name=None):
+    """
+    名前の形式（省略時は ENVOCAB_AUDIO_CODEC）。auto なら CODEC_PREFERENCE のうち使える最初のもの。
+    使えない形式を指定したときは ValueError。
+    """
+    name = name or AUDIO_CODEC
+    if name == "auto":
+        name = next(name for name in available_codecs() if name in CODEC_PREFERENCE)
+    if name == "pcm":
+        return Codec("pcm", "wav", pcm_to_wav, wav_to_pcm)
+    if name == "mulaw":
+        return Codec("mulaw", "wav", _mulaw_wav, wav_to_pcm)
+    if name in _FFMPEG_ENCODERS:
+        if _FFMPEG_ENCODERS[name][0] not in _ffmpeg_encoders():
+            raise ValueError(f"audio codec {name} needs ffmpeg with {_FFMPEG_ENCODERS[name][0]}")
+        return _ffmpeg_codec(name)
+    raise ValueError(f"unknown audio codec: {name}")
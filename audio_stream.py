@@ -0,0 +1,153 @@
+"""
+長い段落の音声の逐次配信
+合成を裏のスレッドで 1 文ずつ進め、できた文から static/audio/stream/<キー>/ に
+seg-000.<拡張子>, seg-001... と書き出し、index.json（区切りの一覧と完了したか）を更新する。
+ブラウザは index.json をポーリングして届いた順に続けて再生するので、最初の 1 文ができた時点で聞き始められる。
+全部できたら 1 つのファイルにまとめて音声キャッシュに入れる（次からは通常の再生）。
+同じキーの配信中にもう一度呼ばれたら、新しく合成せず同じ配信を返す（open_stream）。
+合成サービス（tts_service）のワーカープロセスでは run_stream() で同じ書き出しをそのスレッドで行い、
+画面側は read_index() でディレクトリを見て最初の区切りを待つ。
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from audio_cache import MIME_TYPES, static_url
+from utils.utils import write_atomic
+
+STREAM_DIRNAME = "stream"
+STREAM_INDEX = "index.json"
+# 終わった配信のディレクトリを残しておく時間（再生中のブラウザがまだ読みに来る）
+STREAM_TTL_SECONDS = float(os.getenv("ENVOCAB_STREAM_TTL_SECONDS", "600"))
+
+
+class AudioStream:
+    """
+    1 つの配信
+    segments は (int16 の配列, サンプルレート) を 1 文ずつ返すイテレータを作る関数、
+    encode はそれを保存形式のバイト列にする関数、commit は全部の区切りのリストを受け取ってキャッシュに入れる関数。
+    """
+
+    def __init__(self, directory, ext, segments, encode, commit, background=True):
+        self.directory = Path(directory)
+        self.ext = ext
+        self.names = []
+        self.done = False
+        self.error = None
+        self.finished_at = None
+        self.first_ready = threading.Event()
+        self._segments = segments
+        self._encode = encode
+        self._commit = commit
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._write_index()
+        if background:
+            self._thread = threading.Thread(target=self._run, name=f"audio-stream-{self.directory.name[:8]}", daemon=True)
+            self._thread.start()
+        else:
+            self._run()
+
+    @property
+    def url(self):
+        """区切りと index.json があるディレクトリの URL（末尾に / 付き。static/ の外なら None）"""
+        return stream_url(self.directory)
+
+    @property
+    def mime(self):
+        return MIME_TYPES[self.ext]
+
+    def _write_index(self):
+        index = {"segments": self.names, "done": self.done, "error": self.error, "mime": self.mime}
+        write_atomic(self.directory / STREAM_INDEX, json.dumps(index).encode("utf-8"))
+
+    def _run(self):
+        pieces = []
+        try:
+            for samples, sample_rate in self._segments():
+                pieces.append((samples, sample_rate))
+                name = f"seg-{len(self.names):03d}.{self.ext}"
+                write_atomic(self.directory / name, self._encode(samples, sample_rate))
+                self.names.append(name)
+                self._write_index()
+                self.first_ready.set()
+            if not pieces:
+                raise ValueError("no audio was produced")
+            self._commit(pieces)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            self.done = True
+            self.finished_at = time.monotonic()
+            self._write_index()
+            self.first_ready.set()
+
+    def wait_first(self, timeout=None):
+        """最初の区切りができる（か、失敗する）まで待つ。できていれば True"""
+        self.first_ready.wait(timeout)
+        return bool(self.names)
+
+
+def stream_dir(cache_root, key):
+    """キーの配信の区切りと index.json を置くディレクトリ"""
+    return Path(cache_root) / STREAM_DIRNAME / key
+
+
+def stream_url(directory):
+    """配信のディレクトリの URL（末尾に / 付き。static/ の外なら None）"""
+    url = static_url(directory)
+    return None if url is None else url + "/"
+
+
+def read_index(directory):
+    """配信の index.json（segments・done・error・mime）。まだ無ければ None"""
+    try:
+        return json.loads((Path(directory) / STREAM_INDEX).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+_lock = threading.Lock()
+_streams = {}  # キー -> AudioStream
+
+
+def _cleanup_locked(root):
+    now = time.monotonic()
+    for key, stream in list(_streams.items()):
+        if stream.done and now - stream.finished_at > STREAM_TTL_SECONDS:
+            del _streams[key]
+            shutil.rmtree(stream.directory, ignore_errors=True)
+    # 以前のプロセスが残したディレクトリ
+    if root.exists():
+        active = {stream.directory.name for stream in _streams.values()}
+        for directory in root.iterdir():
+            if directory.name not in active and time.time() - directory.stat().st_mtime > STREAM_TTL_SECONDS:
+                shutil.rmtree(directory, ignore_errors=True)
+
+
+def cleanup(cache_root):
+    """期限（STREAM_TTL_SECONDS）を過ぎた配信のディレクトリを消す"""
+    with _lock:
+        _cleanup_locked(Path(cache_root) / STREAM_DIRNAME)
+
+
+def open_stream(cache_root, key, ext, segments, encode, commit):
+    """キーの配信を裏のスレッドで始める（配信中ならそれを返す）。AudioStream を返す"""
+    with _lock:
+        _cleanup_locked(Path(cache_root) / STREAM_DIRNAME)
+        stream = _streams.get(key)
+        if stream is None or (stream.done and stream.error):
+            stream = AudioStream(stream_dir(cache_root, key), ext, segments, encode, commit)
+            _streams[key] = stream
+        return stream
+
+
+def run_stream(cache_root, key, ext, segments, encode, commit):
+    """
+    キーの配信をこのスレッドで最後まで行い、終わった AudioStream を返す（合成サービスのワーカー用）
+    同じキーの配信が同時に走らないことは呼び出し側（tts_service の要求のまとめ）が保証する。
+    前の配信の index.json は最初に空の一覧で上書きされ、区切りは同じ名前で書き直される。
+    """
+    return AudioStream(stream_dir(cache_root, key), ext, segments, encode, commit, background=False)
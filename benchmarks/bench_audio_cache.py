@@ -0,0 +1,74 @@
+"""
+音声のディスクキャッシュのベンチマーク（同じ文をもう一度 🔊 したときの待ち時間）
+
+    python benchmarks/bench_audio_cache.py [--calls 5] [--budget-kb 1024]
+
+ENVOCAB_TTS_ENGINE=stub（読み込み 0.5 秒、合成 0.2ms/文字）で tts.generate_audio_file を呼ぶ。
+キャッシュは一時ディレクトリに作り、保存形式は audio_codec.get_codec()（既定の auto）に従う。
+合成はこのプロセスで行う（ENVOCAB_TTS_WORKERS=0）。ワーカープロセスに任せるとキャッシュへの書き込みが
+ワーカー側で数えられ、ここで出す stats に載らないため。プール越しの待ち時間は bench_tts_service.py で測る。
+  miss    : 初回（音声の読み込み + 合成 + 保存）
+  hit     : 2 回目以降（ファイルを読むだけ）
+  evict   : --budget-kb の容量で 20 文を順に合成したときの残り件数と追い出し件数
+  payload : play_server_generated_audio が iframe に渡す音声の参照（data: URI と URL）の大きさ
+
+計測結果（StubVoice、µ-law の WAV）:
+  miss 1 回目 526.7ms（読み込み込み）、2 文目以降 24.1ms
+  hit  0.3ms（約 96KB の WAV を読んで Base64 にする）
+  evict 1024KB で 20 文 → 10 件残し、10 件追い出し
+  payload data: URI 128,102 B/回（毎回 websocket で送る）→ URL 85 B（本体は 2 回目からブラウザのキャッシュ）
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ENVOCAB_TTS_ENGINE", "stub")
+os.environ.setdefault("ENVOCAB_TTS_WORKERS", "0")
+os.environ.setdefault("ENVOCAB_AUDIO_CACHE_DIR", tempfile.mkdtemp(prefix="envocab-audio-"))
+
+import audio_cache
+import audio_codec
+import tts
+
+SENTENCES = [
+    f"Sentence number {i} describes how researchers measured plant growth near the river." for i in range(20)
+]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=5)
+    parser.add_argument("--budget-kb", type=int, default=1024)
+    args = parser.parse_args()
+
+    misses = [timed(lambda text=text: tts.generate_audio_file(text)) for text in SENTENCES[: args.calls]]
+    hits = [timed(lambda: tts.generate_audio_file(SENTENCES[0])) for _ in range(args.calls)]
+    print(f"   miss: first {misses[0]:7.1f}ms  next {statistics.median(misses[1:]):7.1f}ms")
+    print(f"    hit: {statistics.median(hits):7.1f}ms")
+    print(f"  stats: {audio_cache.get_audio_cache().stats()}")
+
+    # 保存形式（既定では µ-law の WAV）は実際に使われたものに合わせる
+    ext = audio_codec.get_codec().ext
+    key = tts.audio_cache_key(SENTENCES[0], 1.0, "en")
+    payload, mime = audio_cache.get_audio_cache().get(key)
+    cache = audio_cache.AudioCache(tempfile.mkdtemp(prefix="envocab-audio-"), budget_bytes=args.budget_kb * 1024)
+    for text in SENTENCES:
+        cache.put(tts.audio_cache_key(text, 1.0, "en"), payload, ext)
+    print(f"  evict: {args.budget_kb}KB budget, {len(SENTENCES)} sentences -> {cache.stats()}")
+
+    data_uri = f"data:{mime};base64,{tts.base64.b64encode(payload).decode()}"
+    url = f"{audio_cache.STATIC_URL}/audio/{key}.{ext}"
+    print(f"payload: {len(payload):,} B {mime}  data URI {len(data_uri):,} B  URL {len(url):,} B")
+
+if __name__ == "__main__":
+    main()
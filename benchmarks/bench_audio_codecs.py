@@ -0,0 +1,80 @@
+"""
+音声の保存・配信形式ごとの大きさと品質（コーパス全文）
+
+    python benchmarks/bench_audio_codecs.py [--limit N] [--codecs pcm mulaw opus ...]
+
+コーパスの英文をすべて StubVoice（文字数に比例した長さの 220Hz の正弦波、22.05kHz）で等速に合成し、
+audio_codec の各形式で符号化したときの合計サイズ・1 秒あたりのバイト数・pcm との比と、
+復号した波形の SN 比（サンプル位置がそのまま揃う形式だけ。opus などは -）を出す。
+--codecs を省くとこの環境で使える形式すべて（ffmpeg が無ければ mulaw と pcm）。
+3 速度ぶんの合計は等速の (1 + 1/0.7 + 1/1.3) 倍として見積もる。
+
+計測結果（ffmpeg 無しの環境、654 文・3.23 時間分）:
+     codec        total      B/s   vs pcm     SNR   3 speeds    encode
+       pcm     489.2 MB   44,102   100.0% lossless    1564 MB      2.3s
+     mulaw     244.6 MB   22,053    50.0%  39.4dB     782 MB     10.3s
+opus（24kbps）は約 3,000 B/s の見込みで pcm の 7% ほどになるが、ここでは計測していない。
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import audio_codec
+import presynth
+import voices
+from tts import _synthesize_piper
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--codecs", nargs="+", help="既定はこの環境で使える形式すべて")
+    args = parser.parse_args()
+
+    sentences = presynth.corpus_sentences()[:args.limit]
+    voice = voices.StubVoice()
+    clips = [_synthesize_piper(voice, text) for text in sentences]
+    seconds = sum(len(samples) / sample_rate for samples, sample_rate in clips)
+    print(f"{len(sentences)} sentences, {seconds / 3600:.2f} hours of audio")
+
+    speeds_factor = 1 + 1 / 0.7 + 1 / 1.3
+    pcm_total = None
+    print(f"{'codec':>8} {'total':>12} {'B/s':>8} {'vs pcm':>8} {'SNR':>7} {'3 speeds':>10} {'encode':>9}")
+    for name in args.codecs or list(reversed(audio_codec.available_codecs())):
+        codec = audio_codec.get_codec(name)
+        total = 0
+        signal = noise = 0.0
+        aligned = True
+        start = time.perf_counter()
+        for samples, sample_rate in clips:
+            data = codec.encode(samples, sample_rate)
+            total += len(data)
+            decoded, decoded_rate = codec.decode(data)
+            if decoded_rate == sample_rate and len(decoded) == len(samples):
+                diff = samples.astype(np.float64) - decoded.astype(np.float64)
+                signal += (samples.astype(np.float64) ** 2).sum()
+                noise += (diff ** 2).sum()
+            else:
+                aligned = False
+        elapsed = time.perf_counter() - start
+        pcm_total = pcm_total or (total if name == "pcm" else None)
+        ratio = f"{100 * total / pcm_total:7.1f}%" if pcm_total else f"{'-':>8}"
+        if not aligned:
+            snr = f"{'-':>7}"
+        elif noise == 0:
+            snr = f"{'lossless':>7}"
+        else:
+            snr = f"{10 * np.log10(signal / noise):5.1f}dB"
+        print(
+            f"{name:>8} {total / 1024 / 1024:9.1f} MB {total / seconds:8,.0f} {ratio} {snr} "
+            f"{total * speeds_factor / 1024 / 1024:7.0f} MB {elapsed:8.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
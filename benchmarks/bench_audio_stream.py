@@ -0,0 +1,65 @@
+"""
+逐次配信の最初の音が出るまでの時間のベンチマーク（未合成の段落で 🔊 を押したとき）
+
+    python benchmarks/bench_audio_stream.py [--paragraphs 10] [--seconds-per-char 0.002]
+
+ENVOCAB_TTS_ENGINE=stub で、コーパスの長い順に --paragraphs 件の英文を使う。キャッシュは static/ の下の
+一時ディレクトリに作る（逐次配信は URL で配るため）。
+  full   : 段落全体を合成し終えて URL が返るまで（tts.generate_audio_url）
+  stream : 最初の 1 文の区切りが書き出されるまで（tts._open_piper_stream + wait_first）
+
+計測結果（StubVoice、合成 2ms/文字、長い順に 10 段落、平均 4.8 文）:
+  full   : 中央値 1577.0ms
+  stream : 中央値  307.6ms（残りは再生中に届く。終わると 1 つのファイルとしてキャッシュに入る）
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ENVOCAB_TTS_ENGINE", "stub")
+os.environ.setdefault("ENVOCAB_STUB_LOAD_SECONDS", "0")
+
+import assets
+import audio_cache
+import presynth
+import tts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paragraphs", type=int, default=10)
+    parser.add_argument("--seconds-per-char", type=float, default=0.002)
+    args = parser.parse_args()
+    os.environ["ENVOCAB_STUB_SECONDS_PER_CHAR"] = str(args.seconds_per_char)
+
+    paragraphs = sorted(presynth.corpus_sentences(), key=len, reverse=True)[:args.paragraphs]
+    sentences = [len([s for s in text.replace("!", ".").replace("?", ".").split(".") if s.strip()]) for text in paragraphs]
+    print(f"{len(paragraphs)} paragraphs, {statistics.mean(sentences):.1f} sentences on average")
+
+    root = tempfile.mkdtemp(prefix="bench-audio-", dir=assets.STATIC_DIR)
+    try:
+        for label in ("full", "stream"):
+            audio_cache._cache = audio_cache.AudioCache(os.path.join(root, label))
+            timings = []
+            for text in paragraphs:
+                start = time.perf_counter()
+                if label == "full":
+                    tts.generate_audio_url(text, 1.0, "en-uk")
+                else:
+                    stream = tts._open_piper_stream(text, 1.0)
+                    stream.wait_first()
+                timings.append((time.perf_counter() - start) * 1000)
+                if label == "stream":
+                    stream._thread.join()
+            print(f"{label:>6}: median {statistics.median(timings):7.1f}ms")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
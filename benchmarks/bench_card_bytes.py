@@ -0,0 +1,78 @@
+"""
+カード 1 回の移動あたりに送るバイト数の計測
+
+    python benchmarks/bench_card_bytes.py [--cards 200]
+
+先頭から --cards 枚を順にめくったときに、ブラウザへ送る量を数える。
+  card       : create_flip_card 1 枚分の HTML（シャドーイングタブでは移動ごとにこれを送る）
+  deck window: flip_deck の引数（JSON）1 回分。窓の端に達したときだけ送る
+  per nav    : 送った窓の合計 / 移動回数
+  runtime    : 共有 CSS/JS（初回のみ。以後はブラウザのキャッシュ）
+
+計測結果（654 文のサンプルデータ、200 枚）:
+  共有ランタイム導入前: card 5,249 B、deck window 113,288 B、per nav 7,364 B
+  導入後             : card 1,645 B、deck window  42,870 B、per nav 2,787 B、runtime 3,008 B（初回のみ）
+カードの残りはほぼ本文（例文は段落単位で長く、和訳は JSON 上で 6 バイトのエスケープになる）で、
+固定のマークアップは 1 枚あたり約 600 B。
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+import tabs
+from components import create_flip_card, runtime_assets
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--cards", type=int, default=200)
+    args = parser.parse_args()
+
+    view = corpus.load_corpus_view(args.data_dir)
+    rows = view.all_rows()
+    total = len(rows)
+    steps = min(args.cards, total)
+
+    card_bytes = [
+        len(create_flip_card(
+            view.value("sentence_content_en", int(row)),
+            view.value("translated_sentence", int(row)),
+            f"card_{view.sentence_key(int(row))}",
+            highlight_spans=view.spans.spans_of(int(row)),
+        ).encode("utf-8"))
+        for row in rows[:steps]
+    ]
+
+    # 順にめくり、現在位置が窓から出るたびに窓を送り直す（tabs._deck_window と同じ規則）
+    sent = []
+    window_start = None
+    for position in range(steps):
+        if window_start is not None and window_start <= position < window_start + tabs.DECK_WINDOW:
+            continue
+        window_start = max(0, min(position - tabs.DECK_BACK, total - tabs.DECK_WINDOW))
+        window_rows = rows[window_start:window_start + tabs.DECK_WINDOW]
+        payload = {
+            "cards": [tabs._deck_card(view, int(row)) for row in window_rows],
+            "offset": window_start,
+            "total": total,
+            "position": position,
+            "window_id": f"bench:{window_start}",
+            "batch_size": tabs.RATING_BATCH,
+        }
+        sent.append(len(json.dumps(payload).encode("utf-8")))
+
+    runtime_bytes = sum(os.path.getsize(path) for path in runtime_assets().values())
+    print(f"{steps} navigations over {total} sentences")
+    print(f"{'card':>12}: {sum(card_bytes) / len(card_bytes):10,.0f} B")
+    print(f"{'deck window':>12}: {sum(sent) / len(sent):10,.0f} B  x {len(sent)} windows")
+    print(f"{'per nav':>12}: {sum(sent) / steps:10,.0f} B")
+    print(f"{'runtime':>12}: {runtime_bytes:10,} B  (once, cached)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+カード描画コストのベンチマーク
+
+    python benchmarks/bench_card_render.py [--repeat 5]
+
+コーパス全文について create_flip_card を 1 回ずつ呼び、1 枚あたりの描画時間を比較する。
+  baseline : 改修前の create_flip_card（benchmarks/baseline/ にそのまま残したもの。単語ごとに re.compile + re.sub）
+  matcher  : highlight_words から単一パスのマッチャーで毎回位置を検出
+  spans    : スナップショットの計算済みスパン表を渡す
+  deck cold: デッキ用の 1 枚（和訳のハイライト検出込み）を描画済みカードの LRU が空の状態で作る
+  deck warm: 同じカードをもう一度（LRU のヒット）
+  tu base / tu : text_utils.highlight_words_in_sentence だけを改修前（baseline/）と現行で比べる
+
+計測結果（654 枚、best of 10、1 コア）:
+  baseline : 234.7 us/card
+  matcher  :  79.0 us/card（x3.0）
+  spans    :  53.8 us/card（x4.4。改修前の tabs と同じ呼び方の baseline に対して）
+  tu base  : 264.2 us/card → tu : 44.8 us/card（x5.9）
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import components
+import corpus
+import tabs
+import text_utils
+from components import create_flip_card
+
+
+def load_baseline(name):
+    """benchmarks/baseline/<name>.py（改修前のモジュール）を現行のモジュールと別名で読み込む"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline", f"{name}.py")
+    spec = importlib.util.spec_from_file_location(f"baseline_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    df, _ = corpus.load_frames(args.data_dir)
+    sentence_words = corpus.load_sentence_words(args.data_dir)
+    span_table = corpus.load_span_table(args.data_dir)
+    rows = list(zip(df["sentence_content_en"], df["translated_sentence"]))
+
+    baseline_components = load_baseline("components")
+    baseline_text_utils = load_baseline("text_utils")
+    words_dicts = [dict(enumerate(sentence_words.terms_of(row))) for row in range(len(rows))]
+
+    def run_baseline():
+        for row, (en, ja) in enumerate(rows):
+            baseline_components.create_flip_card(en, ja, f"card_{row}", highlight_words=sentence_words.terms_of(row))
+
+    def run_baseline_text_utils():
+        for (en, _), words_dict in zip(rows, words_dicts):
+            baseline_text_utils.highlight_words_in_sentence(en, words_dict, None)
+
+    def run_text_utils():
+        for (en, _), words_dict in zip(rows, words_dicts):
+            text_utils.highlight_words_in_sentence(en, words_dict, None)
+
+    def run_matcher():
+        for row, (en, ja) in enumerate(rows):
+            create_flip_card(en, ja, f"card_{row}", highlight_words=sentence_words.terms_of(row))
+
+    def run_spans():
+        for row, (en, ja) in enumerate(rows):
+            create_flip_card(en, ja, f"card_{row}", highlight_spans=span_table.spans_of(row))
+
+    view = corpus.load_corpus_view(args.data_dir)
+
+    def run_deck():
+        for row in range(len(view)):
+            tabs._deck_card(view, row)
+
+    def clear_cache():
+        components._card_cache.clear()
+
+    print(f"{len(rows)} cards, best of {args.repeat}")
+    # (表示名, 実行する関数, 毎回の前処理, 倍率の基準にする表示名)
+    cases = (
+        ("baseline", run_baseline, None, "baseline"),
+        ("matcher", run_matcher, None, "baseline"),
+        ("spans", run_spans, None, "baseline"),
+        ("deck cold", run_deck, clear_cache, "baseline"),
+        ("deck warm", run_deck, None, "baseline"),
+        ("tu base", run_baseline_text_utils, None, "tu base"),
+        ("tu", run_text_utils, None, "tu base"),
+    )
+    timings = {}
+    for label, fn, setup, reference in cases:
+        best = float("inf")
+        for _ in range(args.repeat):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        timings[label] = per_card_us = best / len(rows) * 1e6
+        print(f"{label:>9}: {per_card_us:8.1f} us/card  (x{timings[reference] / per_card_us:4.1f} vs {reference})")
+    print(f"card cache: {components.card_cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+コーパス読み込みベンチマーク: CSV 直読み (従来) vs コンパイル済みスナップショット
+（参考: 軽量カタログのみ / 1 グループのシャードのみの読み込み /
+ 順番通りデッキの最初の 20 文を ShardedCorpus で読んだときの時間と常駐バイト数）
+
+    python benchmarks/bench_corpus_load.py [--scale 100] [--repeat 5]
+
+data/ の 28 グループ（実データ）と、それを scale 倍に複製した一時コーパスで
+コールドスタート相当（キャッシュなし）の読み込み時間を比較する。
+
+計測例（1 CPU, --scale 20 --repeat 3）:
+  x1 :   654 文 | deck 4.5 ms  常駐   84 kB（CorpusView 全体   702 kB）
+  x20: 13080 文 | deck 13.7 ms 常駐  439 kB（CorpusView 全体 12641 kB）
+常駐の増分は逆引き（1 文あたり約 30 B）だけで、本文は読んだグループの分しか持たない。
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+import corpus
+
+
+def legacy_load(data_dir):
+    """従来の load_all_csv_data / load_word_master 相当（glob + read_csv + concat）"""
+    frames = [pd.read_csv(p) for p in glob.glob(os.path.join(data_dir, "group*.csv"))]
+    df = pd.concat(frames, ignore_index=True)
+    word_master = pd.read_csv(os.path.join(data_dir, "word_master.csv"))
+    return df, word_master
+
+
+def snapshot_load(data_dir):
+    return corpus.load_frames(data_dir)
+
+
+def catalog_load(data_dir):
+    catalog = corpus.load_catalog(data_dir)
+    return catalog, None
+
+
+def group_load(data_dir):
+    catalog = corpus.load_catalog(data_dir)
+    loader = corpus.GroupLoader(data_dir, catalog, 1 << 30)
+    return loader.get(int(catalog.groups.group_ids[0])), None
+
+
+def deck_load(data_dir):
+    """順番通りモード相当: カタログ + 先頭 20 文の本文（必要なシャードだけ読む）"""
+    catalog = corpus.load_catalog(data_dir)
+    view = corpus.ShardedCorpus(corpus.GroupLoader(data_dir, catalog, 1 << 30))
+    for row in view.all_rows()[:20]:
+        view.value("sentence_content_en", int(row))
+    return view, None
+
+
+def resident_bytes(view):
+    """ShardedCorpus が常駐させているバイト数（読み込んだシャード + 逆引き。単語表は全モード共通なので除く）"""
+    index = view.loader.catalog.index
+    return view.loader.cache.size + index.indptr.nbytes + index.rows.nbytes
+
+
+def replicate(src_dir, dst_dir, scale):
+    """グループ CSV を scale 倍に複製（group_id を振り直す）"""
+    sources = corpus.group_files(src_dir)
+    next_id = 1
+    for _ in range(scale):
+        for path in sources:
+            df = pd.read_csv(path)
+            df["group_id"] = next_id
+            df.to_csv(os.path.join(dst_dir, f"group{next_id}.csv"), index=False)
+            next_id += 1
+    shutil.copy(os.path.join(src_dir, "word_master.csv"), dst_dir)
+
+
+def best_of(fn, data_dir, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df, _ = fn(data_dir)
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(df)
+
+
+def run(label, data_dir, repeat):
+    start = time.perf_counter()
+    corpus.build_snapshot(data_dir)
+    build_s = time.perf_counter() - start
+    size_mb = os.path.getsize(corpus.snapshot_dir(data_dir) / corpus.SNAPSHOT_FILENAME) / 1e6
+
+    legacy_s, rows = best_of(legacy_load, data_dir, repeat)
+    snap_s, snap_rows = best_of(snapshot_load, data_dir, repeat)
+    assert rows == snap_rows
+    catalog_s, _ = best_of(catalog_load, data_dir, repeat)
+    group_s, _ = best_of(group_load, data_dir, repeat)
+    deck_s, _ = best_of(deck_load, data_dir, repeat)
+    deck_kb = resident_bytes(deck_load(data_dir)[0]) / 1e3
+    full_kb = corpus.load_corpus_view(data_dir).nbytes / 1e3
+    files = len(corpus.group_files(data_dir))
+    print(f"{label:>8} | {files:5d} files | {rows:7d} rows | "
+          f"csv {legacy_s * 1000:8.1f} ms | snapshot {snap_s * 1000:8.1f} ms | "
+          f"x{legacy_s / snap_s:5.1f} | catalog {catalog_s * 1000:6.1f} ms | "
+          f"catalog+1 group {group_s * 1000:6.1f} ms | deck {deck_s * 1000:6.1f} ms {deck_kb:8.0f} kB "
+          f"(full {full_kb:8.0f} kB) | build {build_s * 1000:8.1f} ms | {size_mb:6.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--scale", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as base:
+        # 実データを汚さないよう、1 倍も一時ディレクトリにコピーして計測する
+        for scale in (1, args.scale):
+            work = os.path.join(base, f"x{scale}")
+            os.makedirs(work)
+            replicate(args.data_dir, work, scale)
+            run(f"x{scale}", work, args.repeat if scale == 1 else max(1, args.repeat // 2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+コーパスのメモリ表現の比較（1 文あたりのバイト数）
+
+    python benchmarks/bench_corpus_memory.py
+
+  DataFrame   : 従来の pd.read_csv 相当（object/string 列・int64）を memory_usage(deep=True) で計測
+  CorpusView  : カテゴリ化した sentence_type・最小幅の整数・UTF-8 バッファ + オフセットの本文
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+
+def main(data_dir="data"):
+    df, _ = corpus.load_frames(data_dir)
+    df = df.astype({c: object for c in df.columns if df[c].dtype != "int64"})
+    frame_bytes = int(df.memory_usage(deep=True).sum())
+    frame_columns = int(df.drop(columns=["words_contained_dict"]).memory_usage(deep=True).sum())
+
+    view = corpus.load_corpus_view(data_dir)
+    report = view.memory_report()
+
+    view_columns = sum(size for name, size in report["components"].items() if name.startswith("column:"))
+
+    print(f"{len(df)} sentences")
+    print(f"columns only   DataFrame {frame_columns / len(df):8.0f} B/sentence | CorpusView {view_columns / len(df):8.0f} B/sentence")
+    print(f"DataFrame : {frame_bytes / 1e6:7.2f} MB  {frame_bytes / len(df):8.0f} B/sentence  (words_contained_dict を文字列のまま含む)")
+    print(f"CorpusView: {report['total'] / 1e6:7.2f} MB  {report['bytes_per_sentence']:8.0f} B/sentence  (単語 CSR・逆引き・スパン表込み)")
+    for name, size in sorted(report["components"].items(), key=lambda item: -item[1]):
+        print(f"  {name:<32} {size / len(view):8.1f} B/sentence")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
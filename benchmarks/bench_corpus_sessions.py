@@ -0,0 +1,59 @@
+"""
+セッション数に対するコーパスのメモリ・CPU コスト
+
+    python benchmarks/bench_corpus_sessions.py [--sessions 50] [--reruns 3]
+
+st.cache_data は戻り値を pickle して保持し、呼び出しのたびに unpickle したコピーを返す。
+st.cache_resource は同じオブジェクトを返す。N セッション × 再実行ぶんの呼び出しを
+それぞれのセマンティクスで再現し、生存中の割り当て量 (tracemalloc) と時間を比較する。
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+
+
+def simulate(label, make_value, copy_per_call, sessions, reruns):
+    value = make_value()
+    cached = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL) if copy_per_call else value
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = []
+    for _ in range(sessions):
+        for _ in range(reruns):
+            obj = pickle.loads(cached) if copy_per_call else cached
+        # 各セッションは最後の再実行で受け取ったものを保持し続ける（同時接続中）
+        held.append(obj)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    calls = sessions * reruns
+    print(f"{label:<32} live {current / 1e6:8.1f} MB | peak {peak / 1e6:8.1f} MB | "
+          f"{elapsed / calls * 1000:7.2f} ms/call")
+    return held
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--reruns", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus.ensure_snapshot(args.data_dir)
+    print(f"{args.sessions} sessions x {args.reruns} reruns")
+    simulate("cache_data  DataFrame x2 (old)", lambda: corpus.load_frames(args.data_dir), True, args.sessions, args.reruns)
+    simulate("cache_data  CorpusView", lambda: corpus.load_corpus_view(args.data_dir), True, args.sessions, args.reruns)
+    simulate("cache_resource CorpusView (new)", lambda: corpus.load_corpus_view(args.data_dir), False, args.sessions, args.reruns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+フラグメント単位の再実行の確認（実際のサーバーに WebSocket で接続して操作する）
+
+    ENVOCAB_PROFILE=1 streamlit run app.py --server.headless true --server.port 8599
+    python benchmarks/bench_fragment_reruns.py [--url ws://localhost:8599/_stcore/stream]
+
+速度ボタン（🚀）をブラウザと同じ形で押し、その再実行で動いた領域を profiling の記録から表示する。
+AppTest はフラグメントだけの再実行を再現しないため、サーバー経由で確かめる。
+
+計測結果（サンプルデータ）:
+  app           : data 22.0ms, card_viewer 4.8ms, speed_selector 5.5ms, tab:learn 29.5ms, ..., tab:progress 4.3ms
+  speed_selector: speed_selector 1.3ms   （データ読み込み・progress_tab は実行されない）
+"""
+import argparse
+import asyncio
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetStates
+
+
+async def rerun(ws, widget_states=None, fragment_id=""):
+    """再実行を 1 回要求し、script_finished までの ForwardMsg を返す"""
+    msg = BackMsg()
+    msg.rerun_script.query_string = ""
+    msg.rerun_script.page_script_hash = ""
+    msg.rerun_script.widget_states.CopyFrom(widget_states or WidgetStates())
+    if fragment_id:
+        msg.rerun_script.fragment_id = fragment_id
+    await ws.send(msg.SerializeToString())
+    received = []
+    while True:
+        forward = ForwardMsg()
+        forward.ParseFromString(await asyncio.wait_for(ws.recv(), 60))
+        received.append(forward)
+        if forward.WhichOneof("type") == "script_finished":
+            return received
+
+
+def elements(messages):
+    for forward in messages:
+        if forward.WhichOneof("type") == "delta" and forward.delta.WhichOneof("type") == "new_element":
+            yield forward.delta, forward.delta.new_element
+
+
+def timing_lines(messages):
+    """サイドバーの「⏱ 実行時間」の行（ENVOCAB_PROFILE=1 のときだけ出る）"""
+    return [
+        element.markdown.body
+        for _, element in elements(messages)
+        if element.WhichOneof("type") == "markdown" and element.markdown.body.startswith("**") and "ms" in element.markdown.body
+    ]
+
+
+async def main(url, label):
+    async with websockets.connect(url, subprotocols=["streamlit"], max_size=None) as ws:
+        button = None
+        for delta, element in elements(await rerun(ws)):
+            if element.WhichOneof("type") == "button" and element.button.label.endswith(label):
+                button = (element.button.id, delta.fragment_id)
+        if button is None:
+            raise SystemExit(f"button {label!r} not found")
+
+        states = WidgetStates()
+        widget = states.widgets.add()
+        widget.id = button[0]
+        widget.trigger_value = True
+        fragment_run = await rerun(ws, states, button[1])
+        print(f"fragment {button[1] or '-'}: {sum(1 for _ in elements(fragment_run))} elements re-sent")
+
+        # 記録はサイドバーに出るので、もう一度アプリ全体を実行して読む
+        for line in timing_lines(await rerun(ws))[:3]:
+            print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="ws://localhost:8599/_stcore/stream")
+    parser.add_argument("--button", default="🚀", help="押すボタンのラベル末尾")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.button))
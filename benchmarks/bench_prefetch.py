@@ -0,0 +1,62 @@
+"""
+先読み合成のベンチマーク（次のカードで 🔊 を押してから音声の URL が返るまで）
+
+    python benchmarks/bench_prefetch.py [--cards 10] [--read-seconds 1.0]
+
+ENVOCAB_TTS_ENGINE=stub（合成 1ms/文字）で、コーパスの先頭から 1 枚ずつ進みながら 🔊 を押す。
+カードを読む時間として --read-seconds 待ってからタップする。キャッシュは一時ディレクトリに作る。
+  off: 先読み無し（タップのたびにその場で合成）
+  on : カードを表示した時点で prefetch.Prefetcher に次の PREFETCH_AHEAD 枚を予定する
+
+計測結果（StubVoice、合成 1ms/文字、読む時間 1 秒、10 枚）:
+  off: 中央値 192.6ms（最大 772.7ms、初回は音声の読み込み込み）
+  on : 中央値   2.6ms（最大   7.0ms）  すべてキャッシュヒット
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ENVOCAB_TTS_ENGINE", "stub")
+os.environ.setdefault("ENVOCAB_STUB_LOAD_SECONDS", "0")
+os.environ.setdefault("ENVOCAB_STUB_SECONDS_PER_CHAR", "0.001")
+
+import audio_cache
+import prefetch
+import presynth
+import tts
+
+
+def tap_latencies(sentences, read_seconds, prefetcher):
+    timings = []
+    for i, text in enumerate(sentences):
+        if prefetcher is not None:
+            prefetcher.schedule("bench", [(t, 1.0) for t in sentences[i:i + prefetch.PREFETCH_AHEAD + 1]])
+        time.sleep(read_seconds)
+        start = time.perf_counter()
+        tts.generate_audio_url(text, 1.0, prefetch.PLAY_LANG)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cards", type=int, default=10)
+    parser.add_argument("--read-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    sentences = presynth.corpus_sentences()
+    for label, use_prefetch, offset in (("off", False, 0), ("on", True, args.cards)):
+        audio_cache._cache = audio_cache.AudioCache(tempfile.mkdtemp(prefix="envocab-audio-"))
+        prefetcher = prefetch.Prefetcher() if use_prefetch else None
+        timings = tap_latencies(sentences[offset:offset + args.cards], args.read_seconds, prefetcher)
+        print(f"{label:>3}: median {statistics.median(timings):7.1f}ms  max {max(timings):7.1f}ms")
+        if prefetcher is not None:
+            print(f"     {prefetcher.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+速度違いの音声の作り方のベンチマーク（1 文を 🐌・🎵・🚀 の 3 速度で用意するまで）
+
+    python benchmarks/bench_time_stretch.py [--seconds-per-char 0.002]
+
+ENVOCAB_TTS_ENGINE=stub で、コーパスの長めの文（約 200 文字）を使う。
+  synth x3 : 速度ごとに合成し直した場合（Piper の length_scale 相当、合成 3 回）
+  stretch  : 等速を 1 回合成し、0.7・1.3 は timestretch.time_stretch で作る（tts の実装）
+あわせて伸縮後の長さの比と、220Hz の正弦波を伸縮したときの音程（FFT のピーク）を出す。
+
+計測結果（StubVoice、合成 2ms/文字）:
+  synth x3 : 1203.2ms
+  stretch  :  458.6ms（合成 396.2ms + 伸縮 0.7 が 38.8ms、1.3 が 23.5ms）
+  長さの比 0.7 → 1/0.700、1.3 → 1/1.300、音程 220.0Hz のまま（1.3 で 220.1Hz）
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ENVOCAB_TTS_ENGINE", "stub")
+
+import voices
+from timestretch import time_stretch
+from tts import _synthesize_piper
+
+TEXT = (
+    "Recent studies in the Environmental Science department have discovered a significant correlation "
+    "between market dynamics and plant sustainability, even in regions with huge industrial development."
+)
+SPEEDS = (0.7, 1.0, 1.3)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds-per-char", type=float, default=0.002)
+    args = parser.parse_args()
+    voice = voices.StubVoice(seconds_per_char=args.seconds_per_char)
+
+    total = 0.0
+    for rate in SPEEDS:
+        _, ms = timed(lambda: list(voice.synthesize_stream_raw(TEXT, length_scale=1 / rate)))
+        total += ms
+    print(f"synth x3 : {total:7.1f}ms")
+
+    (base, sample_rate), synth_ms = timed(lambda: _synthesize_piper(voice, TEXT))
+    stretch_ms = {}
+    for rate in (0.7, 1.3):
+        stretched, stretch_ms[rate] = timed(lambda: time_stretch(base, rate, sample_rate))
+        ratio = len(base) / len(stretched)
+        print(f"  x{rate}: length ratio 1/{ratio:.3f}")
+    print(f"stretch  : {synth_ms + sum(stretch_ms.values()):7.1f}ms  (synth {synth_ms:.1f}ms + "
+          + ", ".join(f"x{rate} {ms:.1f}ms" for rate, ms in stretch_ms.items()) + ")")
+
+    sample_rate = 22050
+    sine = (8000 * np.sin(2 * np.pi * 220 * np.arange(sample_rate * 3) / sample_rate)).astype(np.int16)
+    for rate in (0.7, 1.3):
+        stretched = time_stretch(sine, rate, sample_rate).astype(float)
+        peak = np.argmax(np.abs(np.fft.rfft(stretched))) * sample_rate / len(stretched)
+        print(f"  x{rate}: 220Hz sine -> peak {peak:.1f}Hz")
+
+
+if __name__ == "__main__":
+    main()
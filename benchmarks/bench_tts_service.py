@@ -0,0 +1,102 @@
+"""
+合成サービスの負荷試験（先読みが詰まっているときのタップの待ち時間）
+
+    python benchmarks/bench_tts_service.py [--workers 2] [--prefetch 40] [--taps 8] [--queue-size 64]
+
+ENVOCAB_TTS_ENGINE=stub（読み込み 0.3 秒、合成 2ms/文字）で tts_service.SynthesisService を動かす。
+キャッシュは一時ディレクトリに作る。先読み --prefetch 件を一度に積んだ直後から、
+0.2 秒おきに --taps 件のタップ（別の文）を送り、タップが返るまでの時間を測る。
+  priority : タップを INTERACTIVE で送る（先読みより先に処理される）
+  fifo     : タップも PREFETCH で送る（優先度が無い場合と同じ、積んだ順）
+あわせて、キューを小さく（--queue-size 8）したときに先読みが断られ、タップが先読みを押し出す様子と、
+期限 0.5 秒のタップが期限切れになる様子を stats で出す。
+
+計測結果（StubVoice、ワーカー 2、先読み 40 件、タップ 8 件）:
+  priority : 中央値 1135.0ms、最大  2400.6ms
+  fifo     : 中央値 13947.8ms、最大 15109.1ms
+  queue 8  : 先読み 31 件を断り、タップが 6 件を押し出した
+  deadline : 期限 0.5 秒のタップ 8 件はすべて TimeoutError（うち 3 件は処理が始まる前にキューで期限切れ）
+（1 コアの環境なので、ワーカー 2 でも合成は実際には並列にならない）
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ENVOCAB_TTS_ENGINE", "stub")
+os.environ.setdefault("ENVOCAB_STUB_LOAD_SECONDS", "0.3")
+os.environ.setdefault("ENVOCAB_STUB_SECONDS_PER_CHAR", "0.002")
+os.environ.setdefault("ENVOCAB_AUDIO_CACHE_DIR", tempfile.mkdtemp(prefix="envocab-audio-"))
+
+import presynth
+import tts_service
+
+
+def run(service, prefetch_texts, tap_texts, tap_priority, tap_timeout=None):
+    for text in prefetch_texts:
+        try:
+            service.submit(text, 1.0, "en-uk", tts_service.PREFETCH)
+        except tts_service.ServiceBusy:
+            pass
+    timings = []
+    errors = []
+
+    def tap(text):
+        start = time.perf_counter()
+        try:
+            service.synthesize(text, 1.0, "en-uk", tap_priority, tap_timeout)
+            timings.append((time.perf_counter() - start) * 1000)
+        except Exception as e:
+            errors.append(type(e).__name__)
+
+    threads = []
+    for text in tap_texts:
+        thread = threading.Thread(target=tap, args=(text,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.2)
+    for thread in threads:
+        thread.join()
+    return timings, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--prefetch", type=int, default=40)
+    parser.add_argument("--taps", type=int, default=8)
+    parser.add_argument("--queue-size", type=int, default=64)
+    args = parser.parse_args()
+
+    sentences = presynth.corpus_sentences()
+    offset = 0
+
+    def take(count):
+        nonlocal offset
+        offset += count
+        return sentences[offset - count:offset]
+
+    # ワーカーを起こして音声を読み込ませておく
+    warm = tts_service.SynthesisService(args.workers, args.queue_size)
+    for future in [warm.submit(text, 1.0, "en-uk") for text in take(args.workers * 2)]:
+        future.result()
+
+    for label, priority in (("priority", tts_service.INTERACTIVE), ("fifo", tts_service.PREFETCH)):
+        timings, errors = run(warm, take(args.prefetch), take(args.taps), priority)
+        print(f"{label:>8}: median {statistics.median(timings):7.1f}ms  max {max(timings):7.1f}ms  errors {errors}")
+        while warm.stats()["queued"] or warm.stats()["running"]:
+            time.sleep(0.1)
+
+    small = tts_service.SynthesisService(args.workers, 8)
+    timings, errors = run(small, take(args.prefetch), take(args.taps), tts_service.INTERACTIVE)
+    print(f"queue 8 : median {statistics.median(timings):7.1f}ms  {small.stats()}")
+    timings, errors = run(small, [], take(args.taps), tts_service.INTERACTIVE, tap_timeout=0.5)
+    print(f"deadline: {len(timings)} ok, errors {errors}  {small.stats()}")
+
+
+if __name__ == "__main__":
+    main()
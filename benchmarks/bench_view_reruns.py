@@ -0,0 +1,61 @@
+"""
+学習記録が大きいときの再実行時間のベンチマーク
+
+    python benchmarks/bench_view_reruns.py [--sizes 0 10000 100000] [--repeat 5]
+
+AppTest でアプリを実行し、session_state.learning_progress に N 件の記録を入れてから
+各ビューを選んだ状態で再実行し、1 回あたりの時間（中央値）を測る。
+
+計測結果（サンプルデータ）:
+  st.tabs（3 タブとも毎回実行）: 0 件 23.0ms、10,000 件 64.0ms、100,000 件 265.6ms
+  選択中のビューだけを実行:
+     records   学習   シャドーイング   記録
+           0  22.4ms     15.0ms      15.5ms
+      10,000  22.7ms     15.1ms      59.2ms
+     100,000  23.1ms     15.8ms     276.1ms
+"""
+import argparse
+import os
+import statistics
+import time
+
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+VIEWS = ["📚 学習", "🎯 シャドーイング", "📊 記録"]
+LEVELS = ("easy", "normal", "difficult")
+
+
+def fake_progress(size):
+    return {f"{i // 40 + 1}_{i % 40 + 1}": LEVELS[i % 3] for i in range(size)}
+
+
+def measure(size, view, repeat):
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.run()
+    at.session_state.learning_progress = fake_progress(size)
+    at.session_state.active_view = view
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - start) * 1000)
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'records':>8} " + " ".join(f"{view:>12}" for view in VIEWS))
+    for size in args.sizes:
+        row = [measure(size, view, args.repeat) for view in VIEWS]
+        print(f"{size:>8,} " + " ".join(f"{ms:>10.1f}ms" for ms in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+音声モデルのプールのベンチマーク（初回と 2 回目以降の 🔊 の待ち時間）
+
+    python benchmarks/bench_voice_pool.py [--model voices/xx.onnx] [--load-seconds 0.5] [--calls 5]
+
+--model を省くと voices.StubVoice（読み込み --load-seconds 秒、合成は文字数に比例）で測る。
+  per call: 従来の実装（タップごとに PiperVoice.load してから合成）
+  pool    : voices.VoicePool から借りる（読み込みは初回だけ）
+  threads : 8 スレッドから同時に呼んだときの合計時間（プールの大きさごと）
+
+計測結果（StubVoice、読み込み 0.5 秒、合成 0.2ms/文字）:
+  per call: 1 回目 578ms、2 回目以降 571ms
+  pool    : 1 回目 571ms、2 回目以降  70ms
+  threads : 8x5 回をプール 1 で 3327ms、2 で 2049ms、4 で 1290ms
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import voices
+from tts import _synthesize_piper
+
+TEXT = (
+    "Recent studies in the Environmental Science department have discovered a significant correlation "
+    "between market dynamics and plant sustainability. Even in regions with huge industrial development, "
+    "researchers found that a quarter of native plant species can adapt to dangerous levels of pollution."
+)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", help="Piper の .onnx（省略時は StubVoice）")
+    parser.add_argument("--load-seconds", type=float, default=0.5)
+    parser.add_argument("--seconds-per-char", type=float, default=0.0002)
+    parser.add_argument("--calls", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.model:
+        info = voices.VoiceInfo("model", args.model, voices._config_for(voices.Path(args.model)))
+        loader = voices.load_voice
+    else:
+        info = voices.STUB_VOICE
+
+        def loader(_info):
+            return voices.StubVoice(args.load_seconds, args.seconds_per_char)
+
+    def per_call():
+        _synthesize_piper(loader(info), TEXT)
+
+    pool = voices.VoicePool(loader, size=1)
+
+    def pooled():
+        with pool.checkout(info) as voice:
+            _synthesize_piper(voice, TEXT)
+
+    for label, fn in (("per call", per_call), ("pool", pooled)):
+        timings = [timed(fn) for _ in range(args.calls)]
+        print(f"{label:>8}: first {timings[0]:7.1f}ms  warm {statistics.median(timings[1:]):7.1f}ms")
+    print(f"pool stats: {pool.stats()}")
+
+    for size in (1, 2, 4):
+        pool = voices.VoicePool(loader, size=size)
+        threads = [threading.Thread(target=lambda: [pooled_call(pool, info) for _ in range(args.calls)]) for _ in range(8)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f" threads: pool size {size}: 8x{args.calls} calls in {elapsed:7.1f}ms  {pool.stats()}")
+
+
+def pooled_call(pool, info):
+    with pool.checkout(info) as voice:
+        _synthesize_piper(voice, TEXT)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,107 +1,121 @@
 import html as html_module
-import re
+import os
 
+import streamlit.components.v1 as st_components
 
-def create_flip_card(english_text, japanese_text, card_id, show_tap_hint=True, highlight_words=None):
-    """フリップカード用HTML/CSS/JSを生成（タップで英文↔和訳を切り替え）"""
+import assets
+from text_utils import find_word_positions, render_spans
+from utils.utils import LRUCache
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RUNTIME_FILES = {"css": "flip_card.css", "js": "flip_card.js"}
+
+# カードのマークアップを変えたら上げる（描画済みカードのキャッシュキーに含まれる）
+CARD_TEMPLATE_VERSION = 2
+# 描画済みカードの LRU のメモリ予算（MB）。プロセス全体・全セッションで共有する
+CARD_CACHE_MB = float(os.getenv("ENVOCAB_CARD_CACHE_MB", "16"))
+_card_cache = LRUCache(int(CARD_CACHE_MB * 1024 * 1024), size_of=lambda card: len(card["html"]))
+
+# カードの窓を一度に受け取り、めくり・移動・評価をブラウザ側で処理するデッキ
+_flip_deck = st_components.declare_component(
+    "flip_deck", path=os.path.join(_BASE_DIR, "frontend", "flip_deck")
+)
+
+
+def runtime_assets():
+    """共有ランタイム（フリップカードの CSS/JS）の元ファイルのパス"""
+    return {kind: os.path.join(assets.STATIC_DIR, name) for kind, name in RUNTIME_FILES.items()}
+
+
+def runtime_urls():
+    """
+    共有ランタイムの URL（assets.py でビルド済みならハッシュ付きのバンドル）
+    app/static/ から配信するので、CSS/JS を正しい Content-Type で返す Streamlit（requirements.txt の版）が要る。
+    """
+    return {kind: assets.asset_url(name) for kind, name in RUNTIME_FILES.items()}
+
+
+def _target_word(span, escaped_word):
+    return f'<span class="target-word">{escaped_word}</span>'
+
+
+def create_flip_card(
+    english_text,
+    japanese_text,
+    card_id,
+    show_tap_hint=True,
+    highlight_words=None,
+    highlight_spans=None,
+    japanese_spans=None,
+    standalone=True,
+):
+    """
+    フリップカード用HTMLを生成（タップで英文↔和訳を切り替え）
+    highlight_spans（コーパスのスパン表から取得した計算済みの位置）があればそれを使い、
+    無ければ highlight_words から位置を検出する。japanese_spans は裏面（和訳）のハイライト位置。
+    スタイルとスクリプトは共有ランタイム（static/flip_card.*）にあり、カード自体はマークアップだけ。
+    standalone=True のときはランタイムの読み込みタグを付ける（flip_deck は窓ごとに一度だけ読む）。
+    """
     def escape_and_highlight(text, words_to_highlight=None):
-        escaped = html_module.escape(text)
-        if words_to_highlight:
-            for word in words_to_highlight:
-                pattern = re.compile(re.escape(html_module.escape(word)), re.IGNORECASE)
-                escaped = pattern.sub(
-                    f'<span class="target-word">{html_module.escape(word)}</span>',
-                    escaped,
-                )
-        return escaped
+        # 生テキスト上で位置を求めてからエスケープするので、挿入済みのタグに再マッチしない
+        if highlight_spans is not None:
+            return render_spans(text, highlight_spans, _target_word)
+        if not words_to_highlight:
+            return html_module.escape(text)
+        return render_spans(text, find_word_positions(text, words_to_highlight), _target_word)
 
     escaped_en = escape_and_highlight(english_text, highlight_words)
-    escaped_jp = html_module.escape(japanese_text)
+    escaped_jp = render_spans(japanese_text, japanese_spans, _target_word) if japanese_spans else html_module.escape(japanese_text)
     tap_hint = "tap to translate" if show_tap_hint else ""
+    runtime = ""
+    if standalone:
+        # components.html の iframe（srcdoc）は親ページの URL を基準に相対パスを解決する
+        urls = runtime_urls()
+        runtime = f'<link rel="stylesheet" href="{urls["css"]}"><script src="{urls["js"]}"></script>'
+
+    return (
+        f'{runtime}<div class="flip-container"><div class="flip-card" id="flipCard{card_id}">'
+        '<div class="flip-card-face flip-card-front"><div class="flip-card-label">English</div>'
+        f'<div class="flip-card-scroll-container"><div class="flip-card-text">{escaped_en}</div></div>'
+        f'<div class="flip-card-hint">{tap_hint}</div></div>'
+        '<div class="flip-card-face flip-card-back"><div class="flip-card-label">日本語</div>'
+        f'<div class="flip-card-scroll-container"><div class="flip-card-text">{escaped_jp}</div></div>'
+        '<div class="flip-card-hint">tap to return</div></div></div></div>'
+    )
+
+
+def cached_card(corpus_version, sentence_key, highlight_ids, render):
+    """
+    描画済みカードをプロセス全体の LRU から返す（無ければ render() で作って入れる）
+    同じ文・同じハイライト対象・同じテンプレートなら出力は同じなので、
+    キーは (コーパスのバージョン, 文のキー, ハイライト対象, テンプレートのバージョン)。
+    """
+    key = (corpus_version, sentence_key, tuple(highlight_ids), CARD_TEMPLATE_VERSION)
+    return _card_cache.get_or_load(key, render)
+
+
+def card_cache_stats():
+    """描画済みカードのキャッシュの件数・サイズ・ヒット/ミス"""
+    return _card_cache.stats()
+
 
-    flip_card_html = f"""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Source+Serif+4:wght@400;500&family=Noto+Sans+JP:wght@400;500&display=swap');
-
-    .flip-container-{card_id} {{ width: 100%; margin: 0.5rem 0; position: relative; }}
-    .flip-card-{card_id} {{ position: relative; width: 100%; min-height: 200px; cursor: pointer; -webkit-tap-highlight-color: transparent; }}
-    .flip-card-face-{card_id} {{
-        width: 100%; min-height: 200px; border-radius: 8px; padding: 1rem;
-        display: flex; flex-direction: column; align-items: center; text-align: center; box-sizing: border-box;
-        transition: opacity 0.3s ease, transform 0.2s ease;
-    }}
-    .flip-card-front-{card_id} {{ background: #fafafa; color: #1a1a1a; border: 2px solid #e0e0e0; }}
-    .flip-card-back-{card_id} {{ background: #1a1a1a; color: #fafafa; border: 2px solid #333; display: none; }}
-    .flip-card-{card_id}.flipped .flip-card-front-{card_id} {{ display: none; }}
-    .flip-card-{card_id}.flipped .flip-card-back-{card_id} {{ display: flex; }}
-    .flip-card-scroll-container-{card_id} {{
-        flex: 1; width: 100%; max-height: 180px; overflow-y: auto; overflow-x: hidden;
-        -webkit-overflow-scrolling: touch; padding: 0.5rem; text-align: center;
-    }}
-    .flip-card-text-{card_id} {{
-        font-family: 'Source Serif 4', Georgia, serif; font-size: 1.15rem; line-height: 1.9;
-        font-weight: 400; padding: 0.5rem 0; letter-spacing: 0.01em; max-width: 100%; word-wrap: break-word;
-    }}
-    .flip-card-back-{card_id} .flip-card-text-{card_id} {{
-        font-family: 'Noto Sans JP', 'Hiragino Kaku Gothic ProN', sans-serif; font-size: 1.05rem; line-height: 1.8;
-    }}
-    .flip-card-hint-{card_id} {{
-        font-family: -apple-system, BlinkMacSystemFont, sans-serif; font-size: 0.75rem; opacity: 0.5;
-        margin-top: 0.75rem; text-transform: lowercase; letter-spacing: 0.05em;
-        padding: 0.25rem 0.75rem; background: rgba(0,0,0,0.05); border-radius: 12px;
-    }}
-    .flip-card-back-{card_id} .flip-card-hint-{card_id} {{ background: rgba(255,255,255,0.1); }}
-    .flip-card-label-{card_id} {{
-        font-family: -apple-system, BlinkMacSystemFont, sans-serif; font-size: 0.7rem; opacity: 0.4;
-        margin-bottom: 0.5rem; text-transform: uppercase; letter-spacing: 0.15em; font-weight: 600;
-    }}
-    .target-word {{ background: linear-gradient(180deg, transparent 60%, #ffd54f 60%); padding: 0 2px; font-weight: 500; }}
-    .flip-card-back-{card_id} .target-word {{ background: linear-gradient(180deg, transparent 60%, #5c6bc0 60%); color: #fff; }}
-    .flip-card-{card_id}:active .flip-card-face-{card_id} {{ transform: scale(0.98); }}
-    @media (max-width: 400px) {{
-        .flip-card-face-{card_id} {{ min-height: 180px; padding: 0.75rem; }}
-        .flip-card-text-{card_id} {{ font-size: 1.0rem; line-height: 1.7; }}
-        .flip-card-back-{card_id} .flip-card-text-{card_id} {{ font-size: 0.95rem; }}
-        .flip-card-scroll-container-{card_id} {{ max-height: 150px; }}
-    }}
-    </style>
-    <div class="flip-container-{card_id}">
-        <div class="flip-card-{card_id}" id="flipCard{card_id}" onclick="toggleFlipCard{card_id}(event)">
-            <div class="flip-card-face-{card_id} flip-card-front-{card_id}">
-                <div class="flip-card-label-{card_id}">English</div>
-                <div class="flip-card-scroll-container-{card_id}" onclick="event.stopPropagation()">
-                    <div class="flip-card-text-{card_id}">{escaped_en}</div>
-                </div>
-                <div class="flip-card-hint-{card_id}">{tap_hint}</div>
-            </div>
-            <div class="flip-card-face-{card_id} flip-card-back-{card_id}">
-                <div class="flip-card-label-{card_id}">日本語</div>
-                <div class="flip-card-scroll-container-{card_id}" onclick="event.stopPropagation()">
-                    <div class="flip-card-text-{card_id}">{escaped_jp}</div>
-                </div>
-                <div class="flip-card-hint-{card_id}">tap to return</div>
-            </div>
-        </div>
-    </div>
-    <script>
-    function toggleFlipCard{card_id}(event) {{
-        if (event.target.closest('.flip-card-scroll-container-{card_id}')) return;
-        document.getElementById('flipCard{card_id}').classList.toggle('flipped');
-    }}
-    </script>
+def flip_deck(cards, offset, total, position, window_id, batch_size=10, key=None, on_change=None):
     """
-    return flip_card_html
-
-
-def create_swipe_handler():
-    """スワイプジェスチャーのハンドラーJS（Streamlit側で受信）"""
-    return """
-    <script>
-    window.addEventListener('message', function(e) {
-        if (e.data && e.data.type === 'swipe') {
-            const direction = e.data.direction;
-            console.log('Swipe detected:', direction);
-        }
-    });
-    </script>
+    フリップカードの窓（cards）を一度だけ送り、操作はブラウザ内で完結させる双方向コンポーネント。
+    cards は {"key", "html", "words": [[word_id, 単語], ...]} の並び、offset は窓先頭のデッキ内位置。
+    評価がたまったとき・窓の端・音声再生・単語学習のときだけ
+    {"id", "action", "position", "ratings", ["word_id"]} を返す（それ以外は再実行しない）。
+    on_change は値が届いたとき本体より先に呼ばれるので、状態の反映はそこで行える。
     """
+    return _flip_deck(
+        cards=cards,
+        stylesheet=runtime_urls()["css"],
+        offset=offset,
+        total=total,
+        position=position,
+        window_id=window_id,
+        batch_size=batch_size,
+        key=key,
+        on_change=on_change,
+        default=None,
+    )
@@ -0,0 +1,998 @@
+# enVocab コーパススナップショット
+#
+# data/group*.csv と word_master.csv を 1 つの NumPy アーカイブ (.npz) に
+# コンパイルし、コールドスタート時は CSV を一切パースせずに読み込む。
+# data/.corpus/manifest.json にソースの mtime・サイズ・SHA-256 を記録し、
+# いずれかのソースが変わったときだけ再ビルドする。
+#
+# 文字列列は「UTF-8 バッファ + バイトオフセット + 有効マスク」で保存する
+# (pickle 不要、allow_pickle=False で読める)。
+# words_contained_dict はビルド時に一度だけデコードし、行に揃えた CSR 配列
+# (indptr / word_ids / term_ids) として保存する。逆引き（word_id → 文の行番号）
+# も同時に転置して保存し、単語から例文を O(1) + 結果サイズで引けるようにする。
+# 英文中のハイライト位置もビルド時に全行まとめて求め、スパン表として保存する。
+# 単語マスター（と任意の和訳 CSV）は word_id で直接引ける密な単語表にする。
+# 行は group_id 順に並べ、グループごとの行範囲をカタログとして保存する。
+# さらにグループごとのシャード (groups/<version>/<group_id>.npz) と軽量カタログ
+# (catalog.npz) も書き出す。アプリはカタログ（グループの行範囲・単語表・逆引き）だけを常駐させ、
+# 文の本文は順番通り・ランダム・単語学習のモードでも必要なグループのシャードだけを読む（ShardedCorpus）。
+
+import ast
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from text_utils import find_word_positions
+from utils.utils import LRUCache
+
+SNAPSHOT_FORMAT = 10
+SNAPSHOT_DIRNAME = ".corpus"
+SNAPSHOT_FILENAME = "corpus.npz"
+# グループ単位の遅延読み込み用: 軽量カタログ（グループ一覧・件数・単語表・逆引き）とグループごとのシャード
+CATALOG_FILENAME = "catalog.npz"
+SHARD_DIRNAME = "groups"
+MANIFEST_FILENAME = "manifest.json"
+WORD_MASTER_FILENAME = "word_master.csv"
+# 任意: word_id,japanese_meaning の CSV。word_master.csv の japanese_meaning 列より優先
+WORD_MEANINGS_FILENAME = "word_meanings.csv"
+# 和訳の区切り（「発見する、見つける」→ 2 つの訳語として照合）
+_MEANING_SEPARATORS = re.compile(r"[、，,;；/／]")
+
+# 複数セッションが同時にコールドスタートしても再ビルドは 1 回だけにする
+_build_lock = threading.Lock()
+
+
+def _natural_key(path):
+    """group2.csv < group10.csv となるよう数値部分で並べるキー。"""
+    name = os.path.basename(path)
+    return [int(t) if t.isdigit() else t for t in re.split(r"(\d+)", name)]
+
+
+def snapshot_dir(data_dir="data") -> Path:
+    return Path(data_dir) / SNAPSHOT_DIRNAME
+
+
+def group_files(data_dir="data") -> list[str]:
+    """group*.csv を自然順で返す。"""
+    return sorted(glob.glob(os.path.join(data_dir, "group*.csv")), key=_natural_key)
+
+
+def source_files(data_dir="data") -> list[str]:
+    """スナップショットの入力となる全ソースファイル。"""
+    files = group_files(data_dir)
+    for name in (WORD_MASTER_FILENAME, WORD_MEANINGS_FILENAME):
+        path = os.path.join(data_dir, name)
+        if os.path.exists(path):
+            files.append(path)
+    return files
+
+
+def _sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(data_dir="data") -> dict:
+    path = snapshot_dir(data_dir) / MANIFEST_FILENAME
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(data_dir, manifest):
+    path = snapshot_dir(data_dir) / MANIFEST_FILENAME
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def scan_sources(data_dir="data", previous=None) -> dict:
+    """
+    ソースファイルの {ファイル名: {mtime_ns, size, sha256}} を返す。
+    mtime とサイズが前回マニフェストと一致するファイルはハッシュを再計算しない。
+    """
+    previous = previous or {}
+    entries = {}
+    for path in source_files(data_dir):
+        name = os.path.basename(path)
+        stat = os.stat(path)
+        old = previous.get(name)
+        if old and old.get("mtime_ns") == stat.st_mtime_ns and old.get("size") == stat.st_size:
+            entries[name] = old
+            continue
+        entries[name] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": _sha256(path)}
+    return entries
+
+
+def _version_token(sources):
+    """ソース内容のみから決まるバージョン（mtime の変化だけでは変わらない）。"""
+    digest = hashlib.sha256(f"format={SNAPSHOT_FORMAT}".encode())
+    for name in sorted(sources):
+        digest.update(f"{name}:{sources[name]['sha256']}".encode())
+    return digest.hexdigest()[:16]
+
+
+def encode_strings(values):
+    """文字列のシーケンスを (UTF-8 バッファ, バイトオフセット) に詰める。"""
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    if values:
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return buffer, offsets
+
+
+def decode_strings(buffer, offsets):
+    """encode_strings の逆変換。"""
+    data = buffer.tobytes()
+    return [data[offsets[i] : offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def _read_only(array):
+    array.flags.writeable = False
+    return array
+
+
+def _narrow_int(array):
+    """値域に収まる最小の整数型に変換する（group_id・sentence_id などは int16/int32 で足りる）"""
+    if array.dtype.kind not in "iu" or array.size == 0:
+        return array
+    lo, hi = int(array.min()), int(array.max())
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return array.astype(dtype)
+    return array.astype(np.int64)
+
+
+class StringColumn:
+    """
+    文字列列を連続した UTF-8 バッファとバイトオフセットで保持する（Arrow の string 配列と同じ形）。
+    行ごとの Python 文字列オブジェクトを持たず、参照時にその行だけデコードして返す。
+    """
+
+    def __init__(self, data, offsets, valid=None):
+        self.data = data
+        self.offsets = _read_only(_narrow_int(offsets))
+        self.valid = _read_only(valid) if valid is not None and not valid.all() else None
+
+    @classmethod
+    def from_arrays(cls, buffer, offsets, valid=None):
+        return cls(buffer.tobytes(), offsets, valid)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        if self.valid is not None and not self.valid[row]:
+            return None
+        return self.data[self.offsets[row] : self.offsets[row + 1]].decode("utf-8")
+
+    def __iter__(self):
+        return (self[row] for row in range(len(self)))
+
+    @property
+    def nbytes(self):
+        valid = self.valid.nbytes if self.valid is not None else 0
+        return sys.getsizeof(self.data) + self.offsets.nbytes + valid
+
+
+class CategoricalColumn:
+    """種類の少ない文字列列（sentence_type など）をコード配列とカテゴリ一覧で保持する"""
+
+    def __init__(self, codes, categories):
+        self.codes = _read_only(codes)
+        self.categories = tuple(categories)
+
+    @classmethod
+    def from_values(cls, values):
+        categories = sorted({v for v in values if v is not None})
+        lookup = {c: i for i, c in enumerate(categories)}
+        dtype = np.int8 if len(categories) < 127 else np.int32
+        codes = np.fromiter((lookup.get(v, -1) for v in values), dtype=dtype, count=len(values))
+        return cls(codes, categories)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, row):
+        code = self.codes[row]
+        return self.categories[code] if code >= 0 else None
+
+    def __iter__(self):
+        return (self[row] for row in range(len(self)))
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + sum(sys.getsizeof(c) for c in self.categories)
+
+
+def _pack_frame(prefix, df, arrays):
+    """DataFrame の各列を npz 用の配列に変換し、列メタデータを返す。"""
+    columns = []
+    for col in df.columns:
+        series = df[col]
+        key = f"{prefix}.{col}"
+        if pd.api.types.is_numeric_dtype(series) and not series.isna().any():
+            arrays[key] = series.to_numpy()
+            columns.append({"name": col, "kind": "numeric"})
+            continue
+        valid = series.notna().to_numpy()
+        values = ["" if not ok else str(v) for v, ok in zip(series.tolist(), valid)]
+        arrays[key + ".buf"], arrays[key + ".off"] = encode_strings(values)
+        arrays[key + ".valid"] = valid
+        columns.append({"name": col, "kind": "string"})
+    return columns
+
+
+def _unpack_frame(prefix, columns, arrays):
+    data = {}
+    for meta in columns:
+        key = f"{prefix}.{meta['name']}"
+        if meta["kind"] == "numeric":
+            data[meta["name"]] = arrays[key]
+            continue
+        values = decode_strings(arrays[key + ".buf"], arrays[key + ".off"])
+        valid = arrays[key + ".valid"]
+        if not valid.all():
+            values = [v if ok else None for v, ok in zip(values, valid)]
+        data[meta["name"]] = values
+    return pd.DataFrame(data)
+
+
+def decode_words_dict(words_str) -> dict:
+    """words_contained_dict 文字列を {word_id文字列: 単語} に変換（入力フォーマット専用）"""
+    if not isinstance(words_str, str) or not words_str.strip():
+        return {}
+    try:
+        parsed = json.loads(words_str)
+    except ValueError:
+        # 旧サンプルデータの Python リテラル形式 {'1': 'word'} にも対応
+        try:
+            parsed = ast.literal_eval(words_str)
+        except (ValueError, SyntaxError):
+            return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def _build_words_csr(words_column, arrays):
+    """
+    各行の words_contained_dict を CSR 配列に変換して arrays に格納する。
+    term_ids は文中での表記（同じ word_id でも行ごとに異なり得る）を指す。
+    """
+    indptr = np.zeros(len(words_column) + 1, dtype=np.int64)
+    word_ids, term_ids = [], []
+    terms, term_index = [], {}
+    for row, words_str in enumerate(words_column):
+        for word_id, term in decode_words_dict(words_str).items():
+            try:
+                word_id = int(word_id)
+            except (TypeError, ValueError):
+                continue
+            term = str(term)
+            if term not in term_index:
+                term_index[term] = len(terms)
+                terms.append(term)
+            word_ids.append(word_id)
+            term_ids.append(term_index[term])
+        indptr[row + 1] = len(word_ids)
+
+    arrays["words.indptr"] = indptr
+    arrays["words.word_ids"] = np.asarray(word_ids, dtype=np.int32)
+    arrays["words.term_ids"] = np.asarray(term_ids, dtype=np.int32)
+    arrays["terms.buf"], arrays["terms.off"] = encode_strings(terms)
+
+    # 逆引きインデックス: CSR を転置する。安定ソートなので各単語の行番号は昇順のまま
+    entry_word_ids = arrays["words.word_ids"]
+    size = int(entry_word_ids.max()) + 1 if len(entry_word_ids) else 0
+    entry_rows = np.repeat(np.arange(len(words_column), dtype=np.int32), np.diff(indptr))
+    order = np.argsort(entry_word_ids, kind="stable")
+    arrays["index.rows"] = entry_rows[order]
+    arrays["index.indptr"] = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(entry_word_ids, minlength=size), out=arrays["index.indptr"][1:])
+
+
+def _split_meanings(meaning):
+    return [m.strip() for m in _MEANING_SEPARATORS.split(meaning) if m.strip()]
+
+
+def _build_word_table(word_master, meanings, arrays):
+    """
+    word_id → (単語, 和訳, page_num, group_id) の密な表を arrays に格納する。
+    マスターに無い word_id は文中表記で補う。
+    """
+    entry_word_ids = arrays["words.word_ids"]
+    terms = decode_strings(arrays["terms.buf"], arrays["terms.off"])
+    master_ids = word_master["word_id"].astype(int).tolist() if "word_id" in word_master else []
+    size = max(max(master_ids, default=-1), int(entry_word_ids.max()) if len(entry_word_ids) else -1) + 1
+
+    content = [""] * size
+    for word_id, term_id in zip(entry_word_ids, arrays["words.term_ids"]):
+        if not content[word_id]:
+            content[word_id] = terms[term_id]
+    meaning = [""] * size
+    page_num = np.full(size, -1, dtype=np.int32)
+    group_id = np.full(size, -1, dtype=np.int32)
+
+    def column(name):
+        return word_master[name].tolist() if name in word_master else [None] * len(master_ids)
+
+    for word_id, word, jp, page, group in zip(
+        master_ids, column("word_content"), column("japanese_meaning"), column("page_num"), column("group_id")
+    ):
+        if isinstance(word, str) and word:
+            content[word_id] = word
+        if isinstance(jp, str):
+            meaning[word_id] = jp.strip()
+        if page is not None and not pd.isna(page):
+            page_num[word_id] = int(page)
+        if group is not None and not pd.isna(group):
+            group_id[word_id] = int(group)
+    for word_id, jp in meanings:
+        if 0 <= word_id < size:
+            meaning[word_id] = jp
+
+    arrays["wordtable.content.buf"], arrays["wordtable.content.off"] = encode_strings(content)
+    arrays["wordtable.meaning.buf"], arrays["wordtable.meaning.off"] = encode_strings(meaning)
+    arrays["wordtable.page_num"] = page_num
+    arrays["wordtable.group_id"] = group_id
+
+
+class WordTable:
+    """
+    word_id をそのまま添字にした単語表。
+    DataFrame のブールマスク検索の代わりに O(1) で単語・和訳・ページ・グループを引く。
+    """
+
+    def __init__(self, content, meaning, page_num, group_id):
+        self.content = content
+        self.meaning = meaning
+        self.page_num = page_num
+        self.group_id = group_id
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(
+            StringColumn.from_arrays(arrays["wordtable.content.buf"], arrays["wordtable.content.off"]),
+            StringColumn.from_arrays(arrays["wordtable.meaning.buf"], arrays["wordtable.meaning.off"]),
+            arrays["wordtable.page_num"],
+            arrays["wordtable.group_id"],
+        )
+
+    def __len__(self):
+        return len(self.content)
+
+    def __contains__(self, word_id):
+        return 0 <= word_id < len(self.content) and bool(self.content[word_id])
+
+    def word(self, word_id) -> str:
+        return self.content[word_id] if 0 <= word_id < len(self.content) else ""
+
+    def meanings_of(self, word_id) -> list[str]:
+        """和訳（区切り文字で分割済み）。未登録なら空リスト"""
+        if not 0 <= word_id < len(self.meaning):
+            return []
+        return _split_meanings(self.meaning[word_id])
+
+    @property
+    def has_meanings(self):
+        return any(self.meaning)
+
+
+def _build_span_table(texts, arrays):
+    """
+    全行の英文について学習対象単語のハイライト位置を 1 パスで求め、
+    行に揃えた CSR (spans.indptr / start / end / word_id) として格納する。
+    """
+    indptr = arrays["words.indptr"]
+    entry_word_ids = arrays["words.word_ids"]
+    entry_term_ids = arrays["words.term_ids"]
+    terms = decode_strings(arrays["terms.buf"], arrays["terms.off"])
+
+    span_indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+    starts, ends, word_ids = [], [], []
+    for row, text in enumerate(texts):
+        lo, hi = indptr[row], indptr[row + 1]
+        # 一致した表記（大文字小文字は無視）を word_id に戻す
+        row_terms = sorted(
+            ((terms[t].lower(), int(w)) for w, t in zip(entry_word_ids[lo:hi], entry_term_ids[lo:hi])),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+        for span in find_word_positions(text, [term for term, _ in row_terms]):
+            matched = span["word"].lower()
+            word_id = next((w for term, w in row_terms if matched == term), -1)
+            starts.append(span["start"])
+            ends.append(span["end"])
+            word_ids.append(word_id)
+        span_indptr[row + 1] = len(starts)
+
+    arrays["spans.indptr"] = span_indptr
+    arrays["spans.start"] = np.asarray(starts, dtype=np.int32)
+    arrays["spans.end"] = np.asarray(ends, dtype=np.int32)
+    arrays["spans.word_id"] = np.asarray(word_ids, dtype=np.int32)
+
+
+class SpanTable:
+    """行ごとの英文ハイライト位置（ビルド時に計算済み）"""
+
+    def __init__(self, indptr, starts, ends, word_ids):
+        self.indptr = indptr
+        self.starts = starts
+        self.ends = ends
+        self.word_ids = word_ids
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays["spans.indptr"], arrays["spans.start"], arrays["spans.end"], arrays["spans.word_id"])
+
+    def spans_of(self, row) -> list[dict]:
+        """行 row のスパン（開始位置順・重なりなし）。safe_html_display / create_flip_card にそのまま渡せる"""
+        lo, hi = self.indptr[row], self.indptr[row + 1]
+        return [
+            {"start": int(s), "end": int(e), "word_id": int(w), "class": "highlight-word"}
+            for s, e, w in zip(self.starts[lo:hi], self.ends[lo:hi], self.word_ids[lo:hi])
+        ]
+
+
+class SentenceWords:
+    """
+    コーパス行 → 学習対象単語の CSR 構造と、その逆引き（単語 → 行）インデックス。
+    行 row の単語は word_ids[indptr[row]:indptr[row + 1]] の O(k) スライスで得られる。
+    """
+
+    def __init__(self, indptr, word_ids, term_ids, terms, word_table, index_indptr, index_rows):
+        self.indptr = indptr
+        self.word_ids = word_ids
+        self.term_ids = term_ids
+        self.terms = terms
+        self.word_table = word_table
+        self.index_indptr = index_indptr
+        self.index_rows = index_rows
+
+    @classmethod
+    def from_arrays(cls, arrays, word_table=None):
+        return cls(
+            arrays["words.indptr"],
+            arrays["words.word_ids"],
+            arrays["words.term_ids"],
+            StringColumn.from_arrays(arrays["terms.buf"], arrays["terms.off"]),
+            word_table if word_table is not None else WordTable.from_arrays(arrays),
+            arrays["index.indptr"],
+            arrays["index.rows"],
+        )
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def word_ids_of(self, row):
+        return self.word_ids[self.indptr[row] : self.indptr[row + 1]]
+
+    def terms_of(self, row) -> list[str]:
+        """行 row に含まれる単語の文中表記"""
+        terms = self.terms
+        return [terms[t] for t in self.term_ids[self.indptr[row] : self.indptr[row + 1]]]
+
+    def items_of(self, row) -> list[tuple[int, str]]:
+        """行 row の (word_id, 文中表記) の一覧"""
+        start, end = self.indptr[row], self.indptr[row + 1]
+        terms = self.terms
+        return [(int(w), terms[t]) for w, t in zip(self.word_ids[start:end], self.term_ids[start:end])]
+
+    def rows_with(self, word_id):
+        """word_id を含む文の行番号（昇順）。逆引きインデックスのスライスなので O(1) + 結果サイズ"""
+        if not 0 <= word_id < len(self.index_indptr) - 1:
+            return self.index_rows[:0]
+        return self.index_rows[self.index_indptr[word_id] : self.index_indptr[word_id + 1]]
+
+    def word(self, word_id) -> str:
+        """word_id → 単語"""
+        return self.word_table.word(word_id)
+
+
+def _build_group_catalog(group_ids, arrays):
+    """group_id 順に並んだ行からグループごとの (group_id, 開始行, 件数) を作る"""
+    ids, starts, counts = np.unique(group_ids, return_index=True, return_counts=True)
+    arrays["catalog.group_ids"] = ids.astype(np.int64)
+    arrays["catalog.starts"] = starts.astype(np.int64)
+    arrays["catalog.counts"] = counts.astype(np.int64)
+
+
+class GroupCatalog:
+    """グループ一覧と各グループの行範囲（サイドバー統計・グループ選択用）"""
+
+    def __init__(self, group_ids, starts, counts):
+        self.group_ids = group_ids
+        self.starts = starts
+        self.counts = counts
+        self._position = {int(g): i for i, g in enumerate(group_ids)}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays["catalog.group_ids"], arrays["catalog.starts"], arrays["catalog.counts"])
+
+    def __len__(self):
+        return len(self.group_ids)
+
+    def __contains__(self, group_id):
+        return int(group_id) in self._position
+
+    def count(self, group_id) -> int:
+        return int(self.counts[self._position[int(group_id)]])
+
+    def row_range(self, group_id) -> range:
+        i = self._position[int(group_id)]
+        return range(int(self.starts[i]), int(self.starts[i] + self.counts[i]))
+
+    def locate(self, row) -> tuple[int, int]:
+        """全体の行番号 → (group_id, グループ内の行番号)"""
+        i = int(np.searchsorted(self.starts, row, side="right")) - 1
+        return int(self.group_ids[i]), int(row - self.starts[i])
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+
+class CorpusView:
+    """
+    読み取り専用のコーパス。列は配列／タプルで保持し、行番号で直接参照する。
+    絞り込みは DataFrame を作らず行番号の配列（デッキ）で表す。
+    """
+
+    TEXT_COLUMNS = ("sentence_content_en", "translated_sentence", "note")
+    CATEGORICAL_COLUMNS = ("sentence_type",)
+
+    def __init__(self, columns, catalog, words, spans, word_table, version=""):
+        self.columns = columns
+        self.catalog = catalog
+        self.words = words
+        self.spans = spans
+        self.word_table = word_table
+        self.version = version
+
+    @classmethod
+    def from_arrays(cls, arrays, version="", word_table=None):
+        """word_table を渡すとそれを共有する（グループのシャードは単語表を持たない）"""
+        meta = {m["name"]: m for m in json.loads(str(arrays["__meta__"]))["corpus"]}
+        columns = {}
+        for name, m in meta.items():
+            key = f"corpus.{name}"
+            if m["kind"] == "numeric":
+                columns[name] = _read_only(_narrow_int(arrays[key]))
+            elif name in cls.TEXT_COLUMNS:
+                columns[name] = StringColumn.from_arrays(arrays[key + ".buf"], arrays[key + ".off"], arrays[key + ".valid"])
+            elif name in cls.CATEGORICAL_COLUMNS:
+                values = StringColumn.from_arrays(arrays[key + ".buf"], arrays[key + ".off"], arrays[key + ".valid"])
+                columns[name] = CategoricalColumn.from_values(list(values))
+        for key in arrays:
+            if isinstance(arrays[key], np.ndarray):
+                _read_only(arrays[key])
+        if word_table is None:
+            word_table = WordTable.from_arrays(arrays)
+        return cls(
+            columns,
+            GroupCatalog.from_arrays(arrays),
+            SentenceWords.from_arrays(arrays, word_table),
+            SpanTable.from_arrays(arrays),
+            word_table,
+            version,
+        )
+
+    def __len__(self):
+        return len(self.columns["group_id"]) if "group_id" in self.columns else 0
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def value(self, column, row):
+        return self.columns[column][row]
+
+    def row(self, row) -> dict:
+        """1 行分の {列名: 値}（DataFrame の行の代わり）"""
+        return {name: values[row] for name, values in self.columns.items()}
+
+    def sentence_key(self, row) -> str:
+        return f"{self.columns['group_id'][row]}_{self.columns['sentence_id'][row]}"
+
+    def all_rows(self):
+        return np.arange(len(self), dtype=np.int64)
+
+    def group_rows(self, group_id):
+        rows = self.catalog.row_range(group_id)
+        return np.arange(rows.start, rows.stop, dtype=np.int64)
+
+    @property
+    def nbytes(self) -> int:
+        """保持しているデータのおおよそのバイト数（単語表は共有なので含めない）"""
+        return sum(self.memory_report()["components"].values())
+
+    def memory_report(self) -> dict:
+        """列・索引ごとのバイト数と 1 文あたりのバイト数"""
+        components = {f"column:{name}": values.nbytes for name, values in self.columns.items()}
+        components["words"] = sum(
+            part.nbytes
+            for part in (self.words.indptr, self.words.word_ids, self.words.term_ids,
+                         self.words.index_indptr, self.words.index_rows)
+        ) + self.words.terms.nbytes
+        components["spans"] = sum(
+            part.nbytes for part in (self.spans.indptr, self.spans.starts, self.spans.ends, self.spans.word_ids)
+        )
+        total = sum(components.values())
+        return {
+            "components": components,
+            "total": total,
+            "sentences": len(self),
+            "bytes_per_sentence": total / len(self) if len(self) else 0.0,
+        }
+
+
+class WordIndex:
+    """単語 → 文の行番号（全体の通し番号）の逆引きインデックス。単語学習のデッキ用"""
+
+    def __init__(self, indptr, rows):
+        self.indptr = indptr
+        self.rows = rows
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays["index.indptr"], arrays["index.rows"])
+
+    def rows_with(self, word_id):
+        """word_id を含む文の行番号（昇順）"""
+        if not 0 <= word_id < len(self.indptr) - 1:
+            return self.rows[:0]
+        return self.rows[self.indptr[word_id] : self.indptr[word_id + 1]]
+
+
+class CorpusCatalog:
+    """
+    サイドバー統計・グループ選択・デッキ作成用の軽量カタログ。
+    文の本文は持たず、グループ一覧・行範囲・共有の単語表・単語の逆引きだけを読み込む。
+    """
+
+    def __init__(self, groups, word_table, index, version=""):
+        self.groups = groups
+        self.word_table = word_table
+        self.index = index
+        self.version = version
+
+    @classmethod
+    def from_arrays(cls, arrays, version=""):
+        for value in arrays.values():
+            _read_only(value)
+        return cls(GroupCatalog.from_arrays(arrays), WordTable.from_arrays(arrays), WordIndex.from_arrays(arrays), version)
+
+    def __len__(self):
+        return self.groups.total
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+
+class GroupLoader:
+    """
+    グループのシャードを必要になったときだけ読み込み、メモリ予算内で LRU 保持する。
+    プロセス全体で共有する想定（スレッドセーフ）。
+    """
+
+    def __init__(self, data_dir, catalog, budget_bytes):
+        self.data_dir = data_dir
+        self.catalog = catalog
+        self.cache = LRUCache(budget_bytes, size_of=lambda view: view.nbytes)
+
+    def _load(self, group_id):
+        path = shard_dir(self.data_dir, self.catalog.version) / f"{int(group_id)}.npz"
+        with np.load(path, allow_pickle=False) as npz:
+            arrays = {key: npz[key] for key in npz.files}
+        return CorpusView.from_arrays(arrays, self.catalog.version, word_table=self.catalog.word_table)
+
+    def get(self, group_id) -> CorpusView:
+        """1 グループ分の CorpusView（行番号はグループ内で 0 始まり）"""
+        if group_id not in self.catalog.groups:
+            raise KeyError(group_id)
+        return self.cache.get_or_load(int(group_id), lambda: self._load(group_id))
+
+
+class ShardedCorpus:
+    """
+    コーパス全体を行番号（group_id 順の通し番号）で引くビュー。CorpusView と同じ呼び出し方で使える。
+    本文・単語・スパンは行を含むグループのシャードを GroupLoader から読むので、常駐するのはカタログと
+    LRU に残っているシャードだけ（コーパスの大きさに比例して増えない）。
+    """
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.catalog = loader.catalog.groups
+        self.word_table = loader.catalog.word_table
+        self.version = loader.catalog.version
+        self.words = _ShardedWords(self)
+        self.spans = _ShardedSpans(self)
+
+    def locate(self, row) -> tuple[CorpusView, int]:
+        """行番号 → (そのグループの CorpusView, グループ内の行番号)"""
+        group_id, local = self.catalog.locate(row)
+        return self.loader.get(group_id), local
+
+    def __len__(self):
+        return self.catalog.total
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def value(self, column, row):
+        view, local = self.locate(row)
+        return view.value(column, local)
+
+    def row(self, row) -> dict:
+        view, local = self.locate(row)
+        return view.row(local)
+
+    def sentence_key(self, row) -> str:
+        view, local = self.locate(row)
+        return view.sentence_key(local)
+
+    def all_rows(self):
+        return np.arange(len(self), dtype=np.int64)
+
+    def group_rows(self, group_id):
+        rows = self.catalog.row_range(group_id)
+        return np.arange(rows.start, rows.stop, dtype=np.int64)
+
+
+class _ShardedWords:
+    """ShardedCorpus.words（SentenceWords と同じ呼び出し方。逆引きはカタログのものを使う）"""
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+
+    def word_ids_of(self, row):
+        view, local = self.corpus.locate(row)
+        return view.words.word_ids_of(local)
+
+    def terms_of(self, row) -> list[str]:
+        view, local = self.corpus.locate(row)
+        return view.words.terms_of(local)
+
+    def items_of(self, row) -> list[tuple[int, str]]:
+        view, local = self.corpus.locate(row)
+        return view.words.items_of(local)
+
+    def rows_with(self, word_id):
+        return self.corpus.loader.catalog.index.rows_with(word_id)
+
+    def word(self, word_id) -> str:
+        return self.corpus.word_table.word(word_id)
+
+
+class _ShardedSpans:
+    """ShardedCorpus.spans（SpanTable と同じ呼び出し方）"""
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+
+    def spans_of(self, row) -> list[dict]:
+        view, local = self.corpus.locate(row)
+        return view.spans.spans_of(local)
+
+
+def _read_sources(data_dir):
+    """CSV を読み込んで (コーパス, 単語マスター, エラー一覧) を返す。"""
+    frames, errors = [], []
+    for path in group_files(data_dir):
+        try:
+            frames.append(pd.read_csv(path))
+        except Exception as e:
+            errors.append((os.path.basename(path), str(e)))
+    corpus_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    word_master_path = os.path.join(data_dir, WORD_MASTER_FILENAME)
+    word_master = pd.DataFrame()
+    if os.path.exists(word_master_path):
+        try:
+            word_master = pd.read_csv(word_master_path)
+        except Exception as e:
+            errors.append((WORD_MASTER_FILENAME, str(e)))
+    return corpus_df, word_master, errors
+
+
+def _read_meanings(data_dir, errors):
+    """word_meanings.csv（任意）を [(word_id, 和訳)] で返す"""
+    path = os.path.join(data_dir, WORD_MEANINGS_FILENAME)
+    if not os.path.exists(path):
+        return []
+    try:
+        df = pd.read_csv(path)
+        return [
+            (int(word_id), str(meaning).strip())
+            for word_id, meaning in zip(df["word_id"], df["japanese_meaning"])
+            if not pd.isna(word_id) and not pd.isna(meaning)
+        ]
+    except Exception as e:
+        errors.append((WORD_MEANINGS_FILENAME, str(e)))
+        return []
+
+
+def _compile_rows(corpus_df, arrays):
+    """コーパス行から列・単語 CSR・逆引き・スパン表・グループカタログを作り、列メタデータを返す"""
+    columns = _pack_frame("corpus", corpus_df, arrays)
+    words_column = corpus_df["words_contained_dict"].tolist() if "words_contained_dict" in corpus_df else [""] * len(corpus_df)
+    _build_words_csr(words_column, arrays)
+    texts = corpus_df["sentence_content_en"].fillna("").astype(str).tolist() if "sentence_content_en" in corpus_df else [""] * len(corpus_df)
+    _build_span_table(texts, arrays)
+    _build_group_catalog(corpus_df["group_id"].to_numpy() if "group_id" in corpus_df else np.zeros(0, dtype=np.int64), arrays)
+    return columns
+
+
+def _write_npz(path, arrays):
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def shard_dir(data_dir, version) -> Path:
+    return snapshot_dir(data_dir) / SHARD_DIRNAME / version
+
+
+def _write_shards(data_dir, version, corpus_df, catalog_arrays):
+    """グループごとのシャードを書き出し、古いバージョンのシャードを削除する"""
+    out_dir = shard_dir(data_dir, version)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for group_id, start, count in zip(
+        catalog_arrays["catalog.group_ids"], catalog_arrays["catalog.starts"], catalog_arrays["catalog.counts"]
+    ):
+        group_df = corpus_df.iloc[start : start + count].reset_index(drop=True)
+        arrays = {}
+        columns = _compile_rows(group_df, arrays)
+        arrays["__meta__"] = np.array(json.dumps({"corpus": columns}, ensure_ascii=False))
+        _write_npz(out_dir / f"{int(group_id)}.npz", arrays)
+
+    for old in (snapshot_dir(data_dir) / SHARD_DIRNAME).iterdir():
+        if old.name != version and old.is_dir():
+            for path in old.iterdir():
+                path.unlink()
+            old.rmdir()
+
+
+def build_snapshot(data_dir="data", sources=None) -> dict:
+    """CSV からスナップショットを作り直し、新しいマニフェストを返す。"""
+    sources = sources if sources is not None else scan_sources(data_dir, read_manifest(data_dir).get("sources"))
+    corpus_df, word_master, errors = _read_sources(data_dir)
+    if "group_id" in corpus_df:
+        # グループの行を連続させ、カタログの (開始, 件数) で範囲を表せるようにする
+        corpus_df = corpus_df.sort_values("group_id", kind="stable").reset_index(drop=True)
+
+    arrays = {}
+    meta = {
+        "corpus": _compile_rows(corpus_df, arrays),
+        "word_master": _pack_frame("word_master", word_master, arrays),
+    }
+    _build_word_table(word_master, _read_meanings(data_dir, errors), arrays)
+    arrays["__meta__"] = np.array(json.dumps(meta, ensure_ascii=False))
+
+    out_dir = snapshot_dir(data_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    _write_npz(out_dir / SNAPSHOT_FILENAME, arrays)
+
+    version = _version_token(sources)
+    catalog_arrays = {k: v for k, v in arrays.items() if k.startswith(("catalog.", "wordtable.", "index."))}
+    _write_npz(out_dir / CATALOG_FILENAME, catalog_arrays)
+    _write_shards(data_dir, version, corpus_df, catalog_arrays)
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": version,
+        "sources": sources,
+        "rows": len(corpus_df),
+        "errors": errors,
+    }
+    _write_manifest(data_dir, manifest)
+    return manifest
+
+
+def ensure_snapshot(data_dir="data") -> tuple[dict, bool]:
+    """
+    スナップショットが最新であることを保証する。
+    戻り値は (マニフェスト, 再ビルドしたか)。
+    """
+    with _build_lock:
+        return _ensure_snapshot_locked(data_dir)
+
+
+def _ensure_snapshot_locked(data_dir):
+    previous = read_manifest(data_dir)
+    sources = scan_sources(data_dir, previous.get("sources"))
+    snapshot_path = snapshot_dir(data_dir) / SNAPSHOT_FILENAME
+    up_to_date = (
+        previous.get("format") == SNAPSHOT_FORMAT
+        and previous.get("version") == _version_token(sources)
+        and snapshot_path.exists()
+    )
+    if up_to_date:
+        if sources != previous.get("sources"):
+            # 内容は同じで mtime だけ変わった（touch・チェックアウト等）: 記録だけ更新
+            previous["sources"] = sources
+            _write_manifest(data_dir, previous)
+        return previous, False
+    return build_snapshot(data_dir, sources), True
+
+
+def load_snapshot_arrays(data_dir="data") -> dict:
+    """スナップショットの全配列をメモリに読み込む（必要ならビルドする）。"""
+    ensure_snapshot(data_dir)
+    return _read_arrays(data_dir)
+
+
+def _read_arrays(data_dir):
+    with np.load(snapshot_dir(data_dir) / SNAPSHOT_FILENAME, allow_pickle=False) as npz:
+        return {key: npz[key] for key in npz.files}
+
+
+def load_frames(data_dir="data") -> tuple[pd.DataFrame, pd.DataFrame]:
+    """スナップショットから (コーパス, 単語マスター) の DataFrame を復元する。"""
+    arrays = load_snapshot_arrays(data_dir)
+    meta = json.loads(str(arrays["__meta__"]))
+    return (
+        _unpack_frame("corpus", meta["corpus"], arrays),
+        _unpack_frame("word_master", meta["word_master"], arrays),
+    )
+
+
+def load_sentence_words(data_dir="data") -> SentenceWords:
+    """スナップショットから文→単語の CSR 構造を読み込む。"""
+    return SentenceWords.from_arrays(load_snapshot_arrays(data_dir))
+
+
+def load_span_table(data_dir="data") -> SpanTable:
+    """スナップショットから英文ハイライトのスパン表を読み込む。"""
+    return SpanTable.from_arrays(load_snapshot_arrays(data_dir))
+
+
+def load_catalog(data_dir="data") -> CorpusCatalog:
+    """軽量カタログ（グループ一覧・行範囲・単語表・逆引き）だけを読み込む。本文は読まない。"""
+    manifest, _ = ensure_snapshot(data_dir)
+    with np.load(snapshot_dir(data_dir) / CATALOG_FILENAME, allow_pickle=False) as npz:
+        arrays = {key: npz[key] for key in npz.files}
+    return CorpusCatalog.from_arrays(arrays, manifest.get("version", ""))
+
+
+def load_corpus_view(data_dir="data") -> CorpusView:
+    """スナップショットから読み取り専用のコーパス（カタログ・単語・スパン表込み）を読み込む。"""
+    manifest, _ = ensure_snapshot(data_dir)
+    return CorpusView.from_arrays(_read_arrays(data_dir), manifest.get("version", ""))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="data/ の CSV からコーパススナップショットをビルド")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--force", action="store_true", help="変更がなくても再ビルドする")
+    args = parser.parse_args()
+
+    if args.force:
+        manifest, rebuilt = build_snapshot(args.data_dir), True
+    else:
+        manifest, rebuilt = ensure_snapshot(args.data_dir)
+    state = "rebuilt" if rebuilt else "up to date"
+    print(f"{snapshot_dir(args.data_dir) / SNAPSHOT_FILENAME}: {state} ({manifest['rows']} rows, version {manifest['version']})")
+    for name, error in manifest.get("errors", []):
+        print(f"  error: {name}: {error}")
@@ -1,50 +1,70 @@
-import glob
-import json
 import os
-import pandas as pd
+import time
 import streamlit as st
 
+import corpus
 
-@st.cache_data
-def load_all_csv_data(data_dir="data"):
-    """全CSVファイルを読み込んで統合"""
-    all_data = []
-    csv_files = glob.glob(os.path.join(data_dir, "group*.csv"))
+# グループ LRU のメモリ予算（MB）
+GROUP_CACHE_MB = float(os.getenv("ENVOCAB_GROUP_CACHE_MB", "64"))
+# ソースファイルの変更確認の間隔（秒）。グループファイルが数千あっても再実行ごとに stat しない
+SNAPSHOT_CHECK_INTERVAL = 2.0
+_last_snapshot_check = {}
 
-    for file_path in csv_files:
-        try:
-            df = pd.read_csv(file_path)
-            all_data.append(df)
-            st.sidebar.success(f"✅ {os.path.basename(file_path)} 読み込み完了")
-        except Exception as e:
-            st.sidebar.error(f"❌ {os.path.basename(file_path)} 読み込みエラー: {str(e)}")
 
-    if all_data:
-        return pd.concat(all_data, ignore_index=True)
-    return pd.DataFrame()
+def _report_snapshot(data_dir):
+    """スナップショットを最新化し、再ビルド時の読み込み結果をサイドバーに表示"""
+    checked = _last_snapshot_check.get(data_dir)
+    if checked and time.monotonic() - checked[0] < SNAPSHOT_CHECK_INTERVAL:
+        return checked[1]
+    manifest, rebuilt = corpus.ensure_snapshot(data_dir)
+    _last_snapshot_check[data_dir] = (time.monotonic(), manifest)
+    if rebuilt:
+        for name, error in manifest.get("errors", []):
+            st.sidebar.error(f"❌ {name} 読み込みエラー: {error}")
+        st.sidebar.success(f"✅ コーパスをコンパイル ({manifest['rows']}文)")
+    return manifest
 
 
-@st.cache_data
-def load_word_master(data_dir="data"):
-    """単語マスターデータを読み込み"""
-    word_master_path = os.path.join(data_dir, "word_master.csv")
-    try:
-        if os.path.exists(word_master_path):
-            return pd.read_csv(word_master_path)
-        st.sidebar.warning("⚠️ word_master.csv が見つかりません")
-        return pd.DataFrame()
-    except Exception as e:
-        st.sidebar.error(f"❌ word_master.csv 読み込みエラー: {str(e)}")
-        return pd.DataFrame()
+@st.cache_resource(max_entries=2)
+def _shared_catalog(data_dir, version):
+    return corpus.load_catalog(data_dir)
+
+
+def load_catalog(data_dir="data"):
+    """グループ一覧・件数・単語表だけの軽量カタログ（サイドバー統計・グループ選択用）"""
+    manifest = _report_snapshot(data_dir)
+    return _shared_catalog(data_dir, manifest["version"])
+
+
+@st.cache_resource(max_entries=2)
+def _shared_group_loader(data_dir, version):
+    """プロセス全体で共有するグループ LRU（GROUP_CACHE_MB の予算内で保持）"""
+    return corpus.GroupLoader(data_dir, _shared_catalog(data_dir, version), int(GROUP_CACHE_MB * 1024 * 1024))
+
+
+def load_group(group_id, data_dir="data"):
+    """1 グループ分のコーパス。必要になったグループのシャードだけを読み込む"""
+    manifest = _report_snapshot(data_dir)
+    return _shared_group_loader(data_dir, manifest["version"]).get(group_id)
+
+
+@st.cache_resource(max_entries=2)
+def _shared_corpus(data_dir, version):
+    """プロセス全体で 1 つだけ持つ全体のビュー（本文はグループ LRU から読む）"""
+    return corpus.ShardedCorpus(_shared_group_loader(data_dir, version))
+
+
+def load_corpus(data_dir="data"):
+    """
+    読み取り専用のコーパス全体（順番通り・ランダム・単語学習のデッキ用）
+    行番号は全体の通し番号。常駐するのはカタログ（行範囲・単語表・逆引き）だけで、
+    本文はデッキが参照した行のグループのシャードだけを GROUP_CACHE_MB の予算内で読み込む。
+    st.cache_resource で全セッションが同じインスタンスを共有する。タブ側は行番号の配列でこれを参照するだけにする。
+    """
+    manifest = _report_snapshot(data_dir)
+    return _shared_corpus(data_dir, manifest["version"])
 
 
 def parse_words_dict(words_str):
-    """words_contained_dict文字列を辞書に変換"""
-    try:
-        if pd.isna(words_str) or words_str == "":
-            return {}
-        if isinstance(words_str, str):
-            return json.loads(words_str.replace("'", '"'))
-        return {}
-    except Exception:
-        return {}
+    """words_contained_dict文字列を辞書に変換（入力フォーマットの解釈用）"""
+    return corpus.decode_words_dict(words_str)
@@ -0,0 +1,140 @@
+"""
+音声の先読み合成
+カードを表示したときに、この先の英文（最低 PREFETCH_AHEAD 枚、カードのデッキではブラウザに送った窓の終わりまで）を
+小さなスレッドプールで合成して音声キャッシュに入れておく。🔊 を押す頃にはキャッシュ済みなので、待たずに再生できる。
+セッションごとに最新の予定だけを残し、ジャンプ・モード変更などで予定が変わったら
+まだ始まっていない分は取り消す（合成中の 1 件はそのまま終わらせてキャッシュに入れる）。
+先読みしない画面（記録・記事の生成前のシャドーイング）に移ったら cancel_prefetch() で予定ごと取り消す。
+合成は tts_service に先読みの優先度で頼むので、タップの合成が先読みの後ろで待たされることはない。
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PREFETCH_AHEAD = int(os.getenv("ENVOCAB_PREFETCH_AHEAD", "10"))
+PREFETCH_WORKERS = int(os.getenv("ENVOCAB_PREFETCH_WORKERS", "1"))
+PLAY_LANG = "en-uk"  # play_server_generated_audio と同じ
+
+
+def _synthesize(text, rate):
+    import tts_service
+
+    tts_service.synthesize(text, rate, PLAY_LANG, priority=tts_service.PREFETCH)
+
+
+def _is_cached(text, rate):
+    import tts
+    from audio_cache import get_audio_cache
+
+    return tts.audio_cache_key(text, rate, PLAY_LANG) in get_audio_cache()
+
+
+class Prefetcher:
+    """
+    セッションごとの先読みの予定を持つスケジューラ（スレッドセーフ）
+    schedule() は呼ぶたびにそのセッションの予定を置き換える。同じ予定なら何もしない。
+    """
+
+    def __init__(self, workers=PREFETCH_WORKERS, synthesize=_synthesize, is_cached=_is_cached):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="prefetch")
+        self._synthesize = synthesize
+        self._is_cached = is_cached
+        self._lock = threading.Lock()
+        self._plans = {}  # session_id -> (予定の items, [future])
+        self._running = set()  # 合成中の (text, rate)。別セッションと重ねて合成しない
+        self.scheduled = 0
+        self.cached = 0
+        self.cancelled = 0
+        self.synthesized = 0
+        self.failed = 0
+
+    def schedule(self, session_id, items):
+        """items: 合成しておく [(text, rate)]（先に並んだものから合成する）"""
+        items = tuple(items)
+        with self._lock:
+            plan = self._plans.get(session_id)
+            if plan is not None and plan[0] == items:
+                return
+            if plan is not None:
+                self.cancelled += sum(future.cancel() for future in plan[1])
+            futures = [self._executor.submit(self._run, item) for item in items]
+            self.scheduled += len(futures)
+            self._plans[session_id] = (items, futures)
+            # 予定が全部終わったセッションは忘れる（閉じたセッションの分が残らないように）
+            for sid in [sid for sid, (_, fs) in self._plans.items() if sid != session_id and all(f.done() for f in fs)]:
+                del self._plans[sid]
+
+    def cancel(self, session_id):
+        """そのセッションのまだ始まっていない先読みを取り消す"""
+        with self._lock:
+            plan = self._plans.pop(session_id, None)
+            if plan is not None:
+                self.cancelled += sum(future.cancel() for future in plan[1])
+
+    def _run(self, item):
+        with self._lock:
+            if item in self._running:
+                self.cached += 1
+                return
+            self._running.add(item)
+        try:
+            if self._is_cached(*item):
+                outcome = "cached"
+            else:
+                self._synthesize(*item)
+                outcome = "synthesized"
+        except Exception:
+            outcome = "failed"
+        finally:
+            with self._lock:
+                self._running.discard(item)
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._plans),
+                "scheduled": self.scheduled,
+                "cached": self.cached,
+                "cancelled": self.cancelled,
+                "synthesized": self.synthesized,
+                "failed": self.failed,
+            }
+
+
+_lock = threading.Lock()
+_prefetcher = None
+
+
+def get_prefetcher():
+    """プロセス全体で 1 つの先読みスケジューラ"""
+    global _prefetcher
+    with _lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher()
+        return _prefetcher
+
+
+def prefetch_audio(texts, rate):
+    """
+    現在のセッションの先読みの予定を texts（表示中の文から順に）に置き換える
+    どこまで先を読むかは呼び出し側が決める（カードのデッキは窓の終わりまで）。
+    """
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    if ctx is None or PREFETCH_AHEAD <= 0:
+        return
+    items = [(text, rate) for text in texts if text and text.strip()]
+    get_prefetcher().schedule(ctx.session_id, items)
+
+
+def cancel_prefetch():
+    """現在のセッションのまだ始まっていない先読みを取り消す（先読みする画面を離れたとき）"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    get_prefetcher().cancel(ctx.session_id)
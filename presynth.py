@@ -0,0 +1,180 @@
+"""
+コーパス全文の音声の一括合成
+
+    python presynth.py [--data-dir data] [--speeds 0.7 1.0 1.3] [--workers N] [--limit N] [--force]
+
+コーパス（corpus.load_corpus_view）の sentence_content_en をすべて、各速度で合成して
+音声キャッシュ（audio_cache、既定は static/audio/）に入れる。本番ではこれを先に流しておけば、
+コーパスの文を 🔊 したときにリクエストの中で合成することは無い。
+合成はコア数のプロセスに分けて行う（各プロセスが自分の音声モデルを 1 つ読み込む）。
+1 文の全速度は同じプロセスで扱うので、等速の合成は 1 回だけで、他の速度はそれを伸縮して作る。
+キャッシュ済みの組み合わせは飛ばすので、途中で止めても同じコマンドで続きから再開できる。
+キャッシュの容量（ENVOCAB_AUDIO_CACHE_MB）が全文に足りないと、合成した分が古いものから消えて無駄になる。
+そこで最初の CALIBRATION_SENTENCES 文を合成した大きさから全体を見積もり、容量を超えるならそこで止める
+（必要な ENVOCAB_AUDIO_CACHE_MB を表示する。アプリ側も同じ値で起動すること）。--force なら止めずに続ける。
+"""
+import argparse
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+_BASE_DIR = Path(__file__).resolve().parent
+PLAY_LANG = "en-uk"  # play_server_generated_audio と同じ
+# 容量の見積もりのために先に合成する文の数
+CALIBRATION_SENTENCES = 8
+
+
+def corpus_sentences(data_dir="data"):
+    """コーパスの英文（重複と空は除く、コーパスの順）"""
+    import corpus
+
+    view = corpus.load_corpus_view(data_dir)
+    seen = set()
+    sentences = []
+    for row in range(len(view)):
+        text = (view.value("sentence_content_en", row) or "").strip()
+        if text and text not in seen:
+            seen.add(text)
+            sentences.append(text)
+    return sentences
+
+
+def _synthesize(job):
+    """ワーカープロセスで 1 文を未合成の速度すべてで合成する。[(文, 速度, エラー, バイト数)] を返す"""
+    import tts
+
+    text, rates = job
+    results = []
+    for rate in rates:
+        try:
+            path = tts.synthesize_to_cache(text, rate, PLAY_LANG)
+            results.append((text, rate, None, path.stat().st_size))
+        except Exception as e:
+            results.append((text, rate, f"{type(e).__name__}: {e}", 0))
+    return results
+
+
+def _clip_weight(text, rate):
+    """音声の長さ（≒ファイルの大きさ）の目安。文字数に比例し、速度に反比例する"""
+    return len(text) / rate
+
+
+def presynthesize(data_dir="data", speeds=None, workers=None, limit=None, force=False, log=print):
+    """
+    未合成の (文, 速度) をプロセスプールで合成し、件数をまとめた dict を返す
+    見積もりがキャッシュの容量を超えるときは、較正用の文だけ合成して止める（refused=True）。
+    """
+    import audio_cache
+    import tts
+
+    # 等速を先に合成すれば、他の速度はその伸縮で済む
+    speeds = sorted(set(speeds or tts.AUDIO_SPEEDS), key=lambda rate: abs(rate - 1.0))
+    sentences = corpus_sentences(data_dir)[:limit]
+    cache = audio_cache.get_audio_cache()
+    jobs = []
+    cached_bytes = 0
+    for text in sentences:
+        rates = []
+        for rate in speeds:
+            size = cache.size_of(tts.audio_cache_key(text, rate, PLAY_LANG))
+            if size is None:
+                rates.append(rate)
+            else:
+                cached_bytes += size
+        if rates:
+            jobs.append((text, rates))
+    total = len(sentences) * len(speeds)
+    missing = sum(len(rates) for _, rates in jobs)
+    log(f"{len(sentences)} sentences x {len(speeds)} speeds: {total - missing} cached, {missing} to synthesize")
+
+    workers = workers or os.cpu_count() or 1
+    failures = []
+    done = 0
+    refused = False
+    start = time.perf_counter()
+    last_report = 0.0
+
+    def run(executor, batch):
+        nonlocal done, last_report
+        clips = []
+        for results in executor.map(_synthesize, batch, chunksize=2):
+            failures.extend(result for result in results if result[2])
+            clips.extend(result for result in results if not result[2])
+            done += 1
+            elapsed = time.perf_counter() - start
+            if elapsed - last_report >= 1.0 or done == len(jobs):
+                last_report = elapsed
+                per_second = done / elapsed if elapsed else 0.0
+                log(f"  {done}/{len(jobs)} sentences, {len(failures)} failed, {per_second:.1f} sentences/s")
+        return clips
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            calibration, rest = jobs[:CALIBRATION_SENTENCES], jobs[CALIBRATION_SENTENCES:]
+            calibrated = run(executor, calibration)
+            if rest:
+                needed = _estimate_bytes(calibrated, rest, cached_bytes, log)
+                if needed is not None and needed > cache.budget_bytes:
+                    needed_mb = math.ceil(needed * 1.1 / 1024 / 1024)
+                    log(
+                        f"the corpus needs about {needed / 1024 / 1024:.0f} MB of audio cache, "
+                        f"but ENVOCAB_AUDIO_CACHE_MB is {cache.budget_bytes / 1024 / 1024:.0f} MB"
+                    )
+                    if force:
+                        log("  --force: continuing; older clips will be evicted")
+                    else:
+                        log(f"  set ENVOCAB_AUDIO_CACHE_MB={needed_mb} (for the app too) and run again, or pass --force")
+                        refused = True
+                if not refused:
+                    run(executor, rest)
+    elapsed = time.perf_counter() - start
+
+    for text, rate, error, _ in failures[:10]:
+        log(f"  failed: x{rate} {text[:60]!r}: {error}")
+    if len(failures) > 10:
+        log(f"  ... and {len(failures) - 10} more failures")
+
+    # ワーカーが書いたファイルも含めて数え直す（走査だけで、追い出しはしない）
+    stats = audio_cache.AudioCache(cache.root, cache.budget_bytes).stats()
+    log(f"audio cache: {stats['entries']} files, {stats['size'] / 1024 / 1024:.1f} MB / {stats['max_size'] / 1024 / 1024:.0f} MB")
+    if stats["size"] > stats["max_size"] * 0.9:
+        log("warning: the audio cache is nearly full; raise ENVOCAB_AUDIO_CACHE_MB or older clips will be evicted")
+    synthesized_jobs = jobs[:done]
+    return {
+        "sentences": len(sentences),
+        "clips": total,
+        "synthesized": sum(len(rates) for _, rates in synthesized_jobs) - len(failures),
+        "failed": len(failures),
+        "refused": refused,
+        "seconds": elapsed,
+    }
+
+
+def _estimate_bytes(calibrated, rest, cached_bytes, log):
+    """
+    コーパス全体の音声のバイト数の見積もり（キャッシュ済み + 較正分 + 残りの推定）
+    calibrated は較正で合成できた [(文, 速度, None, バイト数)]。1 つも無ければ None。
+    """
+    sizes = sum(size for _, _, _, size in calibrated)
+    weights = sum(_clip_weight(text, rate) for text, rate, _, _ in calibrated)
+    if not weights:
+        log("  could not calibrate the cache size estimate; skipping the check")
+        return None
+    remaining = sum(_clip_weight(text, rate) for text, rates in rest for rate in rates)
+    return cached_bytes + sizes + sizes / weights * remaining
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="コーパスの英文を全速度で合成して音声キャッシュに入れる")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--speeds", type=float, nargs="+", help="既定は tts.AUDIO_SPEEDS")
+    parser.add_argument("--workers", type=int, help="既定はコア数")
+    parser.add_argument("--limit", type=int, help="先頭 N 文だけ（試し用）")
+    parser.add_argument("--force", action="store_true", help="キャッシュの容量が足りない見積もりでも合成を続ける")
+    args = parser.parse_args()
+    sys.path.insert(0, str(_BASE_DIR))
+    result = presynthesize(args.data_dir, args.speeds, args.workers, args.limit, args.force)
+    sys.exit(1 if result["failed"] or result["refused"] else 0)
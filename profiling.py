@@ -0,0 +1,73 @@
+"""
+操作ごとの実行時間の記録
+1 回の実行（アプリ全体の再実行、またはフラグメントだけの再実行）ごとに、
+どの領域がどれだけ時間を使ったかを session_state に残す。
+ENVOCAB_PROFILE=1 のときはサイドバーに直近の記録を表示する。
+"""
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+PROFILE_ENABLED = os.getenv("ENVOCAB_PROFILE", "") == "1"
+MAX_RUNS = 30
+
+
+def _runs():
+    if "perf_runs" not in st.session_state:
+        st.session_state.perf_runs = deque(maxlen=MAX_RUNS)
+    return st.session_state.perf_runs
+
+
+def begin_run(scope):
+    """新しい実行の記録を始める（scope はアプリ全体なら "app"、フラグメントならその名前）"""
+    _runs().append({"scope": scope, "regions": {}})
+
+
+@contextmanager
+def region(label):
+    """with ブロックの所要時間を現在の実行の記録に加える"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        runs = _runs()
+        if runs:
+            regions = runs[-1]["regions"]
+            regions[label] = regions.get(label, 0.0) + (time.perf_counter() - start) * 1000
+
+
+@contextmanager
+def fragment_region(name):
+    """
+    フラグメント本体の計測
+    フラグメントだけの再実行なら新しい実行として記録し、アプリ全体の実行中ならその一領域として数える。
+    """
+    ctx = get_script_run_ctx()
+    if ctx is not None and ctx.fragment_ids_this_run:
+        begin_run(name)
+    with region(name):
+        yield
+
+
+def last_runs(count=MAX_RUNS):
+    """直近の実行の記録（新しい順）: [{"scope", "regions": {領域: ms}}]"""
+    return list(reversed(list(_runs())[-count:]))
+
+
+def show_timings(count=10, caches=None):
+    """直近の実行ごとの領域別時間（と caches に渡したキャッシュの統計）をサイドバーに表示"""
+    if not PROFILE_ENABLED:
+        return
+    with st.sidebar.expander("⏱ 実行時間", expanded=False):
+        for run in last_runs(count):
+            regions = ", ".join(f"{label} {ms:.1f}ms" for label, ms in run["regions"].items())
+            st.markdown(f"**{run['scope']}**: {regions or '-'}")
+        for name, stats in (caches or {}).items():
+            st.caption(
+                f"{name}: {stats['entries']}件 {stats['size'] / 1024:.0f}KB / "
+                f"hit {stats['hits']} miss {stats['misses']} evict {stats['evictions']}"
+            )
@@ -0,0 +1,6 @@
+// フリップカード共通スクリプト: タップで英文↔和訳を切り替える（本文のスクロール領域は除く）
+document.addEventListener("click", function (event) {
+  if (event.target.closest(".flip-card-scroll-container")) return;
+  const card = event.target.closest(".flip-card");
+  if (card) card.classList.toggle("flipped");
+});
@@ -1,46 +1,175 @@
 import os
-import random
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+import profiling
 from config import GENRE_PROMPTS
-from data_loader import load_all_csv_data, load_word_master, parse_words_dict
+from data_loader import load_corpus, load_group
 from tts import play_server_generated_audio, show_available_voices
-from components import create_flip_card
+from prefetch import PREFETCH_AHEAD, cancel_prefetch, prefetch_audio
+from components import cached_card, create_flip_card, flip_deck
+from text_utils import find_japanese_positions
 from gemini_client import initialize_gemini, generate_content_with_gemini, parse_generated_content
 
+# フリップカードデッキ: 一度に送るカード数・現在位置より前に含める枚数・評価をまとめて送る件数
+DECK_WINDOW = 20
+DECK_BACK = 5
+RATING_BATCH = 10
+DECK_KEY = "flip_deck"
 
-def word_learning_tab(df, word_master):
+
+def _reset_deck_window():
+    """サーバー側で位置を変えたとき、デッキに新しい窓を送り直させる"""
+    st.session_state.deck_nav = st.session_state.get("deck_nav", 0) + 1
+
+
+def _start_word_study(word_id):
+    """単語チップのタップで「この単語を学習」モードに入る"""
+    if st.session_state.get("study_word_id") is None:
+        st.session_state.study_return_idx = st.session_state.current_sentence_idx
+    st.session_state.study_word_id = word_id
+    st.session_state.current_sentence_idx = 0
+    st.session_state.show_translation = False
+    _reset_deck_window()
+
+
+def _end_word_study():
+    """単語学習モードを抜けて元の位置に戻る"""
+    st.session_state.study_word_id = None
+    st.session_state.current_sentence_idx = st.session_state.pop("study_return_idx", 0)
+    st.session_state.show_translation = False
+    _reset_deck_window()
+
+
+def _apply_deck_event():
+    """デッキから届いた操作（位置・まとめて送られた評価・音声・単語学習）を状態に反映"""
+    event = st.session_state.get(DECK_KEY)
+    if not event:
+        return
+    for sentence_key, level in event.get("ratings", []):
+        st.session_state.learning_progress[sentence_key] = level
+        st.session_state.studied_today += 1
+    st.session_state.current_sentence_idx = int(event.get("position", 0))
+    if event.get("action") == "play":
+        st.session_state.deck_play = True
+    elif event.get("action") == "study" and event.get("word_id") is not None:
+        _start_word_study(int(event["word_id"]))
+        st.session_state.deck_changed = True
+
+
+def _persistent_selectbox(label, options, state_key, **kwargs):
+    """
+    ビューを切り替えて描画されない実行があっても選択が残る selectbox（選んだ値は state_key に置く）
+    Streamlit は描画されなかったウィジェットの状態を捨てるので、描画し直すときに state_key の値から戻す。
+    """
+    widget_key = f"{state_key}_select"
+    if st.session_state.get(state_key) not in options:
+        st.session_state[state_key] = options[0]
+    if widget_key not in st.session_state:
+        st.session_state[widget_key] = st.session_state[state_key]
+    st.session_state[state_key] = st.selectbox(label, options, key=widget_key, **kwargs)
+    return st.session_state[state_key]
+
+
+def _resolve_deck(learning_mode, selected_group):
+    """
+    表示するコーパスとデッキ（行番号の配列）を決める
+    どのモードも本文は表示する行のグループのシャードだけを読む（全体のデッキはカタログの行範囲と逆引きで作る）。
+    """
+    study_word_id = st.session_state.get("study_word_id")
+    if study_word_id is not None:
+        # 単語学習モード: 逆引きインデックスから、その単語を含む全文のデッキを作る
+        corpus_view = load_corpus()
+        study_rows = corpus_view.words.rows_with(study_word_id)
+        if len(study_rows):
+            return corpus_view, study_rows, study_word_id
+        _end_word_study()
+
+    if learning_mode == "特定グループ":
+        corpus_view = load_group(selected_group)
+    else:
+        corpus_view = load_corpus()
+    return corpus_view, corpus_view.all_rows(), None
+
+
+def _deck_window(deck_id, position, total):
+    """
+    デッキに送る窓の先頭位置を決める
+    現在位置が窓の中にある間は同じ窓を使い続けるので、デッキ側の表示（めくり状態など）が保たれる。
+    """
+    window = st.session_state.get("deck_window")
+    if window and window[0] == deck_id and window[1] <= position < window[1] + DECK_WINDOW:
+        return window[1]
+    start = max(0, min(position - DECK_BACK, total - DECK_WINDOW))
+    st.session_state.deck_window = (deck_id, start)
+    return start
+
+
+def _deck_card(corpus_view, row_id):
+    """デッキに渡す 1 枚分（カードHTML・評価用キー・単語チップ）。描画結果は全セッションで共有する"""
+    sentence_words = corpus_view.words
+    sentence_key = corpus_view.sentence_key(row_id)
+    word_ids = sentence_words.word_ids_of(row_id)
+
+    def render():
+        english_text = corpus_view.value("sentence_content_en", row_id)
+        japanese_text = corpus_view.value("translated_sentence", row_id)
+        japanese_spans = find_japanese_positions(japanese_text, word_ids, corpus_view.word_table)
+        card_html = create_flip_card(
+            english_text,
+            japanese_text,
+            f"card_{sentence_key}",
+            highlight_spans=corpus_view.spans.spans_of(row_id),
+            japanese_spans=japanese_spans,
+            standalone=False,
+        )
+        return {
+            "key": sentence_key,
+            "html": card_html,
+            "words": [[int(word_id), term] for word_id, term in sentence_words.items_of(row_id)],
+        }
+
+    return cached_card(corpus_view.version, sentence_key, word_ids.tolist(), render)
+
+
+def word_learning_tab(catalog):
     """単語学習タブ - iPhone SE向けフリップカードUI"""
     with st.expander("⚙️ 設定", expanded=False):
         col1, col2 = st.columns(2)
         with col1:
-            learning_mode = st.selectbox(
+            learning_mode = _persistent_selectbox(
                 "学習モード",
                 ["順番通り", "ランダム", "特定グループ"],
+                "learning_mode",
                 help="学習する順序を選択",
             )
         with col2:
+            selected_group = None
             if learning_mode == "特定グループ":
-                selected_group = st.selectbox(
+                selected_group = _persistent_selectbox(
                     "グループ選択",
-                    options=sorted(df["group_id"].unique()),
+                    catalog.groups.group_ids.tolist(),
+                    "selected_group",
+                    format_func=lambda g: f"{g} ({catalog.groups.count(g)}文)",
                 )
-                filtered_df = df[df["group_id"] == selected_group].reset_index(drop=True)
-            else:
-                filtered_df = df.copy()
+        with profiling.region("data"):
+            corpus_view, deck_rows, study_word_id = _resolve_deck(learning_mode, selected_group)
+        sentence_words = corpus_view.words
+        study_rows = deck_rows if study_word_id is not None else None
 
         jump_to = st.number_input(
             "文章番号へジャンプ",
             min_value=1,
-            max_value=len(filtered_df),
-            value=st.session_state.current_sentence_idx + 1,
+            max_value=len(deck_rows),
+            value=min(st.session_state.current_sentence_idx + 1, len(deck_rows)),
             step=1,
         )
         btn_col1, btn_col2 = st.columns(2)
         with btn_col1:
             if st.button("移動", key="jump_btn", use_container_width=True):
                 st.session_state.current_sentence_idx = jump_to - 1
+                _reset_deck_window()
                 st.rerun()
         with btn_col2:
             if st.button("リセット", key="reset_btn", use_container_width=True):
@@ -48,92 +177,88 @@ def word_learning_tab(df, word_master):
                 st.session_state.show_translation = False
                 if "shuffled_indices" in st.session_state:
                     del st.session_state.shuffled_indices
+                _reset_deck_window()
                 st.rerun()
 
-    if learning_mode == "特定グループ":
-        pass
-    else:
-        filtered_df = df.copy()
-
-    if learning_mode == "ランダム":
-        if "shuffled_indices" not in st.session_state or len(st.session_state.shuffled_indices) != len(filtered_df):
-            st.session_state.shuffled_indices = list(range(len(filtered_df)))
-            random.shuffle(st.session_state.shuffled_indices)
-        current_idx = st.session_state.shuffled_indices[
-            st.session_state.current_sentence_idx % len(st.session_state.shuffled_indices)
-        ]
+    if study_rows is not None:
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.markdown(f"📖 **{sentence_words.word(study_word_id)}** を含む文 ({len(study_rows)}文)")
+        with col2:
+            st.button("✖ 終了", key="end_word_study", on_click=_end_word_study, use_container_width=True)
+
+    total_sentences = len(deck_rows)
+    if learning_mode == "ランダム" and study_rows is None:
+        if "shuffled_indices" not in st.session_state or len(st.session_state.shuffled_indices) != total_sentences:
+            st.session_state.shuffled_indices = np.random.permutation(total_sentences)
+            _reset_deck_window()
+        deck_order = deck_rows[st.session_state.shuffled_indices]
     else:
-        current_idx = st.session_state.current_sentence_idx % len(filtered_df)
-
-    current_sentence = filtered_df.iloc[current_idx]
-
-    current_pos = st.session_state.current_sentence_idx + 1
-    total_sentences = len(filtered_df)
-    st.markdown(f'<div class="progress-simple">{current_pos} / {total_sentences}</div>', unsafe_allow_html=True)
-
-    english_text = current_sentence["sentence_content_en"]
-    japanese_text = current_sentence["translated_sentence"]
-    card_id = f"card_{current_idx}"
-
-    words_dict = parse_words_dict(current_sentence.get("words_contained_dict", "{}"))
-    highlight_words = list(words_dict.values()) if words_dict else None
-
-    flip_card_html = create_flip_card(english_text, japanese_text, card_id, highlight_words=highlight_words)
-    st.components.v1.html(flip_card_html, height=280, scrolling=True)
-
-    col1, col2, col3 = st.columns([1.5, 1, 1.5])
-
-    with col1:
-        if st.button("⬅️", key="nav_prev_main", use_container_width=True, disabled=(st.session_state.current_sentence_idx == 0)):
-            st.session_state.current_sentence_idx -= 1
+        deck_order = deck_rows
+
+    if "audio_speed" not in st.session_state:
+        st.session_state.audio_speed = 1.0
+    _card_viewer(corpus_view, deck_order, f"{learning_mode}:{selected_group}:{study_word_id}")
+    _speed_selector()
+
+
+@st.fragment
+def _card_viewer(corpus_view, deck_order, deck_name):
+    """
+    カード表示（フリップカードデッキと音声再生）
+    フラグメントなので、デッキからの報告（評価・窓の端・音声）ではこの領域だけが再実行される。
+    """
+    with profiling.fragment_region("card_viewer"):
+        if st.session_state.pop("deck_changed", False):
+            # 単語学習への切り替えなどデッキ自体が変わるときは、設定欄ごとアプリ全体を再実行する
             st.rerun()
 
-    with col2:
-        if "audio_speed" not in st.session_state:
-            st.session_state.audio_speed = 1.0
-        if st.button("🔊", key="play_audio_main", use_container_width=True):
-            play_server_generated_audio(english_text, rate=st.session_state.audio_speed)
-
-    with col3:
-        if st.button("➡️", key="nav_next_main", use_container_width=True):
-            st.session_state.current_sentence_idx += 1
-            st.rerun()
+        total_sentences = len(deck_order)
+        position = min(max(st.session_state.current_sentence_idx, 0), total_sentences - 1)
+        st.session_state.current_sentence_idx = position
+        deck_id = f"{deck_name}:{st.session_state.get('deck_nav', 0)}"
+        window_start = _deck_window(deck_id, position, total_sentences)
+        window_rows = deck_order[window_start:window_start + DECK_WINDOW]
+
+        # 窓の分のカードを一度に送り、移動・めくり・評価はブラウザ側で処理する（タップごとの再実行をしない）
+        flip_deck(
+            [_deck_card(corpus_view, int(row_id)) for row_id in window_rows],
+            offset=window_start,
+            total=total_sentences,
+            position=position,
+            window_id=f"{deck_id}:{window_start}",
+            batch_size=RATING_BATCH,
+            key=DECK_KEY,
+            on_change=_apply_deck_event,
+        )
 
-    speed_options = {"🐌": 0.7, "🎵": 1.0, "🚀": 1.3}
-    speed_cols = st.columns(3)
-    for i, (icon, rate) in enumerate(speed_options.items()):
-        with speed_cols[i]:
-            selected = st.session_state.audio_speed == rate
-            btn_label = f"{'●' if selected else '○'} {icon}"
-            if st.button(btn_label, key=f"speed_{rate}", use_container_width=True):
-                st.session_state.audio_speed = rate
-                st.rerun()
+        if st.session_state.pop("deck_play", False):
+            english_text = corpus_view.value("sentence_content_en", int(deck_order[position]))
+            play_server_generated_audio(english_text, rate=st.session_state.audio_speed)
 
-    if words_dict:
-        words_html = " ".join([f'<span class="word-chip">{word}</span>' for word in words_dict.values()])
-        st.markdown(f'<div style="text-align:center; padding:0.5rem 0;">{words_html}</div>', unsafe_allow_html=True)
+        # 表示中のカードからこの先の分の音声を裏で合成しておく（デッキの順＝順番・ランダム・グループのまま）。
+        # 窓の中の移動はブラウザ側で済み再実行されないので、窓の終わりまで（最低でも PREFETCH_AHEAD 枚先まで）を頼む
+        ahead = deck_order[position:max(window_start + DECK_WINDOW, position + PREFETCH_AHEAD + 1)]
+        st.session_state.prefetch_texts = [corpus_view.value("sentence_content_en", int(row_id)) for row_id in ahead]
+        prefetch_audio(st.session_state.prefetch_texts, st.session_state.audio_speed)
 
-    st.markdown("---")
 
-    col1, col2, col3 = st.columns(3)
-    understanding_level = None
+def _set_audio_speed(rate):
+    st.session_state.audio_speed = rate
+    prefetch_audio(st.session_state.get("prefetch_texts", []), rate)
 
-    with col1:
-        if st.button("😕\n難しい", key="understand_difficult", use_container_width=True):
-            understanding_level = "difficult"
-    with col2:
-        if st.button("😐\n普通", key="understand_normal", use_container_width=True):
-            understanding_level = "normal"
-    with col3:
-        if st.button("😊\n簡単", key="understand_easy", use_container_width=True):
-            understanding_level = "easy"
 
-    if understanding_level:
-        sentence_key = f"{current_sentence['group_id']}_{current_sentence['sentence_id']}"
-        st.session_state.learning_progress[sentence_key] = understanding_level
-        st.session_state.studied_today += 1
-        st.session_state.current_sentence_idx += 1
-        st.rerun()
+@st.fragment
+def _speed_selector():
+    """再生速度の選択（フラグメントなので、切り替えてもこの 3 つのボタンだけが再実行される）"""
+    with profiling.fragment_region("speed_selector"):
+        speed_options = {"🐌": 0.7, "🎵": 1.0, "🚀": 1.3}
+        speed_cols = st.columns(3)
+        for i, (icon, rate) in enumerate(speed_options.items()):
+            with speed_cols[i]:
+                selected = st.session_state.audio_speed == rate
+                btn_label = f"{'●' if selected else '○'} {icon}"
+                st.button(btn_label, key=f"speed_{rate}", on_click=_set_audio_speed, args=(rate,), use_container_width=True)
 
 
 def shadowing_tab():
@@ -141,6 +266,8 @@ def shadowing_tab():
     st.markdown("## 🎯 AI生成文章でシャドーイング")
 
     if not st.session_state.get("gemini_api_key") or not initialize_gemini():
+        # 読み上げる記事が無い間は、学習タブで予定した先読みを残さない
+        cancel_prefetch()
         st.warning("🔑 Gemini APIキーを設定してください")
         env_key = os.getenv("GOOGLE_API_KEY", "")
         if env_key:
@@ -164,6 +291,7 @@ def shadowing_tab():
         return
 
     if not st.session_state.generated_content:
+        cancel_prefetch()
         st.markdown("### 📝 新しい記事を生成")
         col1, col2 = st.columns([1, 2])
         with col1:
@@ -244,6 +372,11 @@ def shadowing_tab():
         if st.button("🔊", key="shadowing_play_audio", use_container_width=True):
             play_server_generated_audio(current_sentence["english"], rate=st.session_state.shadowing_audio_speed)
 
+    prefetch_audio(
+        [sentence["english"] for sentence in content[current_idx:current_idx + PREFETCH_AHEAD + 1]],
+        st.session_state.shadowing_audio_speed,
+    )
+
     with col3:
         if st.button("➡️", key="shadowing_next", use_container_width=True):
             if current_idx < len(content) - 1:
@@ -269,7 +402,7 @@ def shadowing_tab():
             st.markdown("---")
 
 
-def progress_tab(df):
+def progress_tab(catalog):
     """学習記録タブ"""
     st.markdown("## 📊 学習記録・進捗")
 
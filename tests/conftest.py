@@ -0,0 +1,10 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 試験では Piper のモデルもワーカープロセスも使わない
+os.environ.setdefault("ENVOCAB_TTS_ENGINE", "stub")
+os.environ.setdefault("ENVOCAB_TTS_WORKERS", "0")
+sys.path.insert(0, str(ROOT))
@@ -0,0 +1,42 @@
+"""ビューの切り替え（app.py の active_view）で学習タブの設定が消えないこと"""
+from streamlit.testing.v1 import AppTest
+
+from conftest import ROOT
+
+
+def _app():
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=120)
+    at.run()
+    assert not at.exception
+    return at
+
+
+def test_learning_settings_survive_view_switch():
+    at = _app()
+    at.selectbox(key="learning_mode_select").select("特定グループ").run()
+    at.selectbox(key="selected_group_select").select(5).run()
+    at.session_state.current_sentence_idx = 3
+    at.run()
+
+    at.session_state.active_view = "📊 記録"
+    at.run()
+    assert not at.selectbox  # 学習タブは実行されていない
+    at.session_state.active_view = "📚 学習"
+    at.run()
+
+    assert not at.exception
+    assert at.selectbox(key="learning_mode_select").value == "特定グループ"
+    assert at.selectbox(key="selected_group_select").value == 5
+    assert at.session_state.current_sentence_idx == 3
+
+
+def test_leaving_learning_cancels_prefetch():
+    import prefetch
+
+    at = _app()
+    # AppTest のセッション ID は固定なので、どのテストでも同じ予定を置き換える
+    (session_id,) = prefetch.get_prefetcher()._plans
+
+    at.session_state.active_view = "📊 記録"
+    at.run()
+    assert session_id not in prefetch.get_prefetcher()._plans
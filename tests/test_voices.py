@@ -0,0 +1,50 @@
+"""VoicePool: 要求が来なくなっても空きの音声が解放されること"""
+import time
+
+import voices
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _wait_for(predicate, seconds=2.0):
+    deadline = time.monotonic() + seconds
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_idle_voice_released_without_checkout():
+    clock = FakeClock()
+    pool = voices.VoicePool(loader=lambda info: object(), size=2, idle_seconds=600, clock=clock, reap_interval=0.01)
+    with pool.checkout(voices.STUB_VOICE):
+        pass
+    assert pool.stats()["loaded"] == 1
+
+    clock.now = 599
+    time.sleep(0.05)
+    assert pool.stats()["loaded"] == 1
+
+    clock.now = 601
+    assert _wait_for(lambda: pool.stats()["loaded"] == 0)
+    assert pool.stats()["evictions"] == 1
+    assert _wait_for(lambda: pool._reaper is None)
+
+
+def test_reused_voice_not_released():
+    clock = FakeClock()
+    pool = voices.VoicePool(loader=lambda info: object(), size=1, idle_seconds=600, clock=clock, reap_interval=0.01)
+    with pool.checkout(voices.STUB_VOICE):
+        pass
+    clock.now = 500
+    with pool.checkout(voices.STUB_VOICE):
+        pass
+    clock.now = 700  # 最後の返却（500）から 200 秒
+    time.sleep(0.05)
+    assert pool.stats()["loaded"] == 1
+    assert pool.stats()["reuses"] == 1
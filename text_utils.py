@@ -1,51 +1,81 @@
+import functools
 import html
 import re
 
+@functools.lru_cache(maxsize=2048)
+def _compile_matcher(words):
+    """単語集合を 1 本の正規表現（長い語を先に並べた選択）にまとめてキャッシュ"""
+    alternation = "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+    return re.compile(f"(?:{alternation})", re.IGNORECASE)
+
+
+def get_matcher(target_words):
+    """
+    対象単語群を 1 パスで検出するマッチャー（同じ単語集合なら再コンパイルしない）
+    従来どおり表記そのものを大文字小文字を区別せずに探す（語の途中の一致も含む。語尾変化は広げない）。
+    """
+    words = tuple(sorted({w.strip().lower() for w in target_words if w and w.strip()}))
+    if not words:
+        return None
+    return _compile_matcher(words)
+
+
+def resolve_overlaps(spans):
+    """重なるスパンを長い方を優先して取り除く（開始位置順、O(n log n)）"""
+    ordered = sorted(spans, key=lambda s: (s["start"], s["start"] - s["end"]))
+    resolved = []
+    for span in ordered:
+        if resolved and span["start"] < resolved[-1]["end"]:
+            last = resolved[-1]
+            if span["end"] - span["start"] > last["end"] - last["start"]:
+                resolved[-1] = span
+            continue
+        resolved.append(span)
+    return resolved
 
-def safe_html_display(text, highlight_spans=None):
-    """安全なHTML表示（XSS対策＋ハイライト機能）"""
-    if not highlight_spans:
-        return html.escape(text)
 
-    result = ""
+def render_spans(text, spans, markup):
+    """スパン以外をエスケープし、スパン部分を markup(span, エスケープ済み文字列) で囲む"""
+    parts = []
     last_end = 0
-    spans = sorted(highlight_spans, key=lambda x: x["start"])
-
     for span in spans:
         start, end = span["start"], span["end"]
-        word = span["word"]
-        style_class = span.get("class", "highlight-word")
-
-        if start > last_end:
-            result += html.escape(text[last_end:start])
+        if start < last_end:
+            continue
+        parts.append(html.escape(text[last_end:start]))
+        parts.append(markup(span, html.escape(text[start:end])))
+        last_end = end
+    parts.append(html.escape(text[last_end:]))
+    return "".join(parts)
 
-        escaped_word = html.escape(word)
-        if style_class == "highlight-word":
-            result += f'<mark class="vocab-highlight">{escaped_word}</mark>'
-        else:
-            result += f'<mark class="japanese-highlight">{escaped_word}</mark>'
 
-        last_end = end
+def _mark(span, escaped_word):
+    if span.get("class", "highlight-word") == "highlight-word":
+        return f'<mark class="vocab-highlight">{escaped_word}</mark>'
+    return f'<mark class="japanese-highlight">{escaped_word}</mark>'
 
-    if last_end < len(text):
-        result += html.escape(text[last_end:])
 
-    return result
+def safe_html_display(text, highlight_spans=None):
+    """安全なHTML表示（XSS対策＋ハイライト機能）"""
+    if not highlight_spans:
+        return html.escape(text)
+    return render_spans(text, resolve_overlaps(highlight_spans), _mark)
 
 
-def find_word_positions(sentence, target_words):
-    """文章内の単語位置を検出"""
-    positions = []
-    for word in target_words:
-        pattern = re.compile(re.escape(word), re.IGNORECASE)
-        for match in pattern.finditer(sentence):
-            positions.append({
-                "start": match.start(),
-                "end": match.end(),
-                "word": sentence[match.start() : match.end()],
-                "class": "highlight-word",
-            })
-    return positions
+def find_word_positions(sentence, target_words, css_class="highlight-word"):
+    """文章内の単語位置を 1 パスで検出（開始位置順・重なりなし。重なるときは長い語を優先）"""
+    matcher = get_matcher(target_words)
+    if matcher is None:
+        return []
+    return [
+        {
+            "start": match.start(),
+            "end": match.end(),
+            "word": match.group(),
+            "class": css_class,
+        }
+        for match in matcher.finditer(sentence)
+    ]
 
 
 def highlight_words_in_sentence(sentence, words_dict, word_master):
@@ -57,37 +87,17 @@ def highlight_words_in_sentence(sentence, words_dict, word_master):
     if not target_words:
         return safe_html_display(sentence)
 
-    word_positions = find_word_positions(sentence, target_words)
-    unique_positions = []
-    for pos in word_positions:
-        if not any(p["start"] == pos["start"] and p["end"] == pos["end"] for p in unique_positions):
-            unique_positions.append(pos)
-
-    return safe_html_display(sentence, unique_positions)
+    return safe_html_display(sentence, find_word_positions(sentence, target_words))
 
 
-def highlight_words_in_japanese(japanese_sentence, words_dict, word_master):
-    """日本語訳内の対応する単語をハイライト"""
-    if not words_dict or word_master.empty:
-        return safe_html_display(japanese_sentence)
-
+def find_japanese_positions(japanese_sentence, word_ids, word_table):
+    """word_id 群の和訳（単語表に登録済みのもの）を日本語訳の中から検出"""
     japanese_words = []
-    for word_id, english_word in words_dict.items():
+    for word_id in word_ids:
         try:
-            word_id_int = int(word_id)
-            word_info = word_master[word_master["word_id"] == word_id_int]
-            if not word_info.empty and "japanese_meaning" in word_info.columns:
-                japanese_meaning = word_info.iloc[0]["japanese_meaning"]
-                if japanese_meaning and str(japanese_meaning).strip():
-                    japanese_words.append(str(japanese_meaning).strip())
-        except Exception:
+            japanese_words.extend(word_table.meanings_of(int(word_id)))
+        except (TypeError, ValueError):
             continue
-
     if not japanese_words:
-        return safe_html_display(japanese_sentence)
-
-    word_positions = find_word_positions(japanese_sentence, japanese_words)
-    for pos in word_positions:
-        pos["class"] = "japanese-highlight"
-
-    return safe_html_display(japanese_sentence, word_positions)
+        return []
+    return find_word_positions(japanese_sentence, japanese_words, css_class="japanese-highlight")
@@ -0,0 +1,55 @@
+"""
+音程を変えずに再生速度を変える時間伸縮（WSOLA）
+1 回合成した等速の音声から 🐌・🚀 の音声を作るのに使う（tts の速度違いのキャッシュ）。
+出力のフレームを半分ずつ重ねて足し合わせ、入力側の取り出し位置は
+前のフレームの続きと最も波形が揃う位置を ±SEARCH_MS の範囲で探して決める。
+"""
+import numpy as np
+
+FRAME_MS = 40
+SEARCH_MS = 10
+
+
+def time_stretch(samples, rate, sample_rate):
+    """
+    16bit モノラルの PCM（int16 の配列）を rate 倍速にする（0.7 なら長く、1.3 なら短く）。
+    音程は変わらない。
+    """
+    samples = np.asarray(samples)
+    if rate <= 0:
+        raise ValueError(f"rate must be positive: {rate}")
+    if abs(rate - 1.0) < 1e-3 or len(samples) == 0:
+        return samples.astype(np.int16, copy=True)
+
+    frame = max(2, int(sample_rate * FRAME_MS / 1000) // 2 * 2)
+    hop = frame // 2
+    delta = int(sample_rate * SEARCH_MS / 1000)
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame) / frame)).astype(np.float32)
+
+    out_len = int(round(len(samples) / rate))
+    frames = out_len // hop + 1
+    # 探索範囲と最後のフレームがはみ出さないよう、前後を無音で埋める
+    x = np.concatenate([
+        np.zeros(delta, np.float32),
+        samples.astype(np.float32),
+        np.zeros(frame + hop + 2 * delta + int(hop * rate) + 1, np.float32),
+    ])
+    out = np.zeros(frames * hop + frame, np.float32)
+    weight = np.zeros_like(out)
+
+    previous = delta  # 直前に取り出したフレームの先頭（x 上の位置）
+    for k in range(frames):
+        nominal = delta + int(round(k * hop * rate))
+        if k == 0:
+            start = nominal
+        else:
+            # 直前のフレームの自然な続き（hop 先）と最も相関の高い位置を探す
+            target = x[previous + hop:previous + hop + frame]
+            region = x[nominal - delta:nominal + delta + frame]
+            start = nominal - delta + int(np.argmax(np.correlate(region, target, mode="valid")))
+        out[k * hop:k * hop + frame] += x[start:start + frame] * window
+        weight[k * hop:k * hop + frame] += window
+        previous = start
+
+    out = out[:out_len] / np.maximum(weight[:out_len], 1e-3)
+    return np.clip(np.round(out), -32768, 32767).astype(np.int16)
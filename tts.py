@@ -8,11 +8,32 @@
 # 3. プロジェクト直下に voices/ を作り、その中に配置するか、
 #    環境変数 PIPER_VOICE_PATH で .onnx のパスを指定
 # Piper が使えない場合は自動で gTTS (British English) にフォールバックします。
+# voices/ の走査とモデルの読み込みは voices.py（プロセス全体のレジストリとプール）が受け持ちます。
 
 import io
 import base64
-import os
-from pathlib import Path
+import json
+import time
+
+import audio_codec
+import audio_stream
+import tts_service
+import voices
+from timestretch import time_stretch
+from audio_cache import MIME_TYPES, audio_key, get_audio_cache, static_url
+from utils.utils import LRUCache
+
+# 再生速度の選択肢（tabs の速度ボタンと揃える。presynth.py はこの全速度を用意する）
+AUDIO_SPEEDS = (0.7, 1.0, 1.3)
+# 逐次配信で最初の 1 文を待つ上限（秒）。超えたら通常の合成に切り替える
+FIRST_SEGMENT_TIMEOUT = 60
+# ワーカーが書く配信の index.json を見に行く間隔（秒）
+STREAM_POLL_SECONDS = 0.05
+# 速度違いの伸縮元にする等速の PCM をこのプロセスで覚えておく量（MB）。
+# 保存形式（mp3 など）は非可逆なので、キャッシュのファイルを復号して伸縮し直すことはしない
+BASE_PCM_MB = 16
+_base_pcm = LRUCache(BASE_PCM_MB * 1024 * 1024, size_of=lambda pcm: pcm[0].nbytes)
+
 
 # Streamlit は tts 内で import（循環回避）
 def _st():
@@ -20,85 +41,168 @@ def _st():
     return st
 
 
-def _piper_available():
-    try:
-        import piper
-        return True
-    except ImportError:
-        return False
-
-
-def _get_piper_voice_path():
-    """PIPER_VOICE_PATH または voices/ 内の en_GB 男性モデルを返す。"""
-    env_path = os.getenv("PIPER_VOICE_PATH", "").strip()
-    if env_path and Path(env_path).with_suffix(".onnx").exists():
-        return str(Path(env_path).with_suffix(".onnx"))
-    if env_path and Path(env_path).exists():
-        return env_path
-    voices_dir = Path(__file__).resolve().parent / "voices"
-    if not voices_dir.exists():
-        return None
-    # en_GB の男性候補: northern_english_male, alan, aru
-    for name in ("northern_english_male", "alan", "aru"):
-        for onnx in voices_dir.rglob(f"*{name}*.onnx"):
-            if onnx.with_suffix(onnx.suffix + ".json").exists():
-                return str(onnx)
-            json_alt = Path(str(onnx) + ".json")
-            if json_alt.exists():
-                return str(onnx)
-    return None
+def _synthesize_piper(voice, text):
+    """読み込み済みの PiperVoice で合成して (int16 の配列, サンプルレート) を返す"""
+    import numpy as np
 
+    chunks = list(voice.synthesize_stream_raw(text.strip(), sentence_silence=0.0))
+    if not chunks:
+        raise ValueError("Piper produced no audio")
+    return np.frombuffer(b"".join(chunks), dtype="<i2"), getattr(voice.config, "sample_rate", 22050)
 
-def generate_audio_file(text: str, rate: float = 1.0, lang: str = "en") -> tuple[str | None, str]:
+
+def _piper_base_pcm(voice_info, text, base_key):
     """
-    サーバーで音声を生成し (Base64文字列, MIMEタイプ) で返す。
-    Piper（英国男性）が利用可能なら優先、否则 gTTS（British）にフォールバック。
+    等速の (int16 の配列, サンプルレート)。このプロセスで最近合成した文なら覚えている PCM を、
+    無ければ Piper で合成し直す（キャッシュの非可逆なファイルからは作らない）
     """
-    if not text or not text.strip():
-        return None, "audio/mp3"
+    pcm = _base_pcm.get(base_key)
+    if pcm is None:
+        with voices.get_pool().checkout(voice_info) as voice:
+            pcm = _synthesize_piper(voice, text)
+        _base_pcm.put(base_key, pcm)
+    return pcm
 
-    # Piper: 英国男性、rate は 1.0 に近いときのみ使用（Piper は length_scale 未対応のため）
-    use_piper = _piper_available() and (0.85 <= rate <= 1.15)
-    voice_path = _get_piper_voice_path() if use_piper else None
 
-    if voice_path:
-        try:
-            from piper import PiperVoice
-            import wave
-
-            config_path = Path(voice_path).with_suffix(Path(voice_path).suffix + ".json")
-            if not config_path.exists():
-                config_path = Path(voice_path + ".json")
-            if not config_path.exists():
-                raise FileNotFoundError(f"Piper config not found: {config_path}")
-
-            voice = PiperVoice.load(voice_path, config_path=str(config_path))
-            buf = io.BytesIO()
-            chunks = list(voice.synthesize_stream_raw(text.strip(), sentence_silence=0.0))
-            if not chunks:
-                raise ValueError("Piper produced no audio")
-            wav_bytes = b"".join(chunks)
+def _cached_audio(key, ext, synthesize):
+    """音声キャッシュにあればそのパスを、無ければ synthesize() で作って保存してからパスを返す"""
+    cache = get_audio_cache()
+    path = cache.path(key)
+    if path is None:
+        path = cache.put(key, synthesize(), ext)
+    return path
+
+
+def _synthesize_gtts(text, tts_lang, slow):
+    from gtts import gTTS
+
+    audio_buffer = io.BytesIO()
+    gTTS(text=text, lang=tts_lang, slow=slow).write_to_fp(audio_buffer)
+    return audio_buffer.getvalue()
+
+
+def _audio_plans(text, rate, lang):
+    """
+    (キャッシュキー, 形式, 合成関数) の候補を優先順に返す。
+    Piper（英国男性）が利用可能なら全速度で優先、否则 gTTS（British）にフォールバック。
+    Piper の音声モデルはプロセス全体のプール（voices.VoicePool）から借りるので、読み込みは初回だけ。
+    """
+    plans = []
+    # Piper: 英国男性。他の速度は等速の PCM（_piper_base_pcm）を伸縮して別のキャッシュとして持つ
+    # 保存・配信する形式は audio_codec（ENVOCAB_AUDIO_CODEC）で決まる
+    voice_info = voices.default_voice()
+    if voice_info is not None:
+        codec = audio_codec.get_codec()
+        base_key = audio_key(text, voices.TTS_ENGINE, voice_info.name, 1.0, codec.name)
+
+        def synthesize():
+            return codec.encode(*_piper_base_pcm(voice_info, text, base_key))
+
+        if abs(rate - 1.0) < 1e-3:
+            plans.append((base_key, codec.ext, synthesize))
+        else:
+            def stretch():
+                samples, sample_rate = _piper_base_pcm(voice_info, text, base_key)
+                cache = get_audio_cache()
+                if base_key not in cache:
+                    cache.put(base_key, codec.encode(samples, sample_rate), codec.ext)
+                return codec.encode(time_stretch(samples, rate, sample_rate), sample_rate)
+
+            plans.append((audio_key(text, voices.TTS_ENGINE, voice_info.name, rate, codec.name), codec.ext, stretch))
+
+    # gTTS フォールバック（British English）。MP3 は伸縮できないので、速度は slow の有無だけでキーもそれで分ける
+    tts_lang = "en-uk" if lang in ("en-GB", "en-uk") else "en"
+    slow = rate < 0.8
+    key = audio_key(text, "gtts", tts_lang, 0.5 if slow else 1.0, "mp3")
+    plans.append((key, "mp3", lambda: _synthesize_gtts(text, tts_lang, slow)))
+    return plans
+
+
+def audio_cache_key(text: str, rate: float = 1.0, lang: str = "en") -> str:
+    """この文・速度で再生される音声のキャッシュキー（合成はしない）"""
+    return _audio_plans(text, rate, lang)[0][0]
+
+
+def _piper_stream(text, rate):
+    """
+    Piper の合成を 1 文ずつ配信するための (キー, 拡張子, segments, encode, commit)。
+    Piper が使えない・キャッシュ済み・キャッシュが static/ の外（URL で配れない）なら None。
+    配信する区切りは 1 文ずつ伸縮するが、終わったらキャッシュには通常の合成（_audio_plans）と同じく
+    等速の PCM 全体を 1 回で伸縮したものを入れる（どちらの経路で作っても同じキーは同じ音声になる）。
+    """
+    import numpy as np
+
+    voice_info = voices.default_voice()
+    cache = get_audio_cache()
+    if voice_info is None or static_url(cache.root) is None:
+        return None
+    codec = audio_codec.get_codec()
+    stretch = abs(rate - 1.0) >= 1e-3
+    base_key = audio_key(text, voices.TTS_ENGINE, voice_info.name, 1.0, codec.name)
+    key = audio_key(text, voices.TTS_ENGINE, voice_info.name, rate, codec.name) if stretch else base_key
+    if key in cache:
+        return None
+    base = []
+
+    def segments():
+        with voices.get_pool().checkout(voice_info) as voice:
             sample_rate = getattr(voice.config, "sample_rate", 22050)
-            with wave.open(buf, "wb") as wav:
-                wav.setnchannels(1)
-                wav.setsampwidth(2)
-                wav.setframerate(sample_rate)
-                wav.writeframes(wav_bytes)
-            buf.seek(0)
-            return base64.b64encode(buf.getvalue()).decode(), "audio/wav"
+            for chunk in voice.synthesize_stream_raw(text.strip(), sentence_silence=0.0):
+                samples = np.frombuffer(chunk, dtype="<i2")
+                base.append(samples)
+                yield (time_stretch(samples, rate, sample_rate) if stretch else samples), sample_rate
+
+    def commit(pieces):
+        sample_rate = pieces[0][1]
+        samples = np.concatenate(base)
+        _base_pcm.put(base_key, (samples, sample_rate))
+        if base_key not in cache:
+            cache.put(base_key, codec.encode(samples, sample_rate), codec.ext)
+        if stretch:
+            cache.put(key, codec.encode(time_stretch(samples, rate, sample_rate), sample_rate), codec.ext)
+
+    return key, codec.ext, segments, codec.encode, commit
+
+
+def _open_piper_stream(text, rate):
+    """_piper_stream() の配信をこのプロセスの裏のスレッドで始めて AudioStream を返す（配信しないなら None）"""
+    plan = _piper_stream(text, rate)
+    return None if plan is None else audio_stream.open_stream(get_audio_cache().root, *plan)
+
+
+def stream_to_cache(text: str, rate: float = 1.0, lang: str = "en"):
+    """
+    Piper の合成を 1 文ずつ配信しながら（audio_stream.run_stream）キャッシュに入れ、キャッシュのファイルのパスを返す。
+    合成サービスのワーカーで動く。配信できない・途中で失敗したときは synthesize_to_cache() と同じ。
+    """
+    plan = _piper_stream(text, rate)
+    if plan is not None:
+        stream = audio_stream.run_stream(get_audio_cache().root, *plan)
+        path = None if stream.error else get_audio_cache().path(plan[0])
+        if path is not None:
+            return path
+    return synthesize_to_cache(text, rate, lang)
+
+
+def synthesize_to_cache(text: str, rate: float = 1.0, lang: str = "en"):
+    """音声を合成してキャッシュのファイルのパスを返す（キャッシュ済みなら合成しない）"""
+    *preferred, fallback = _audio_plans(text, rate, lang)
+    for key, ext, synthesize in preferred:
+        try:
+            return _cached_audio(key, ext, synthesize)
         except Exception:
             pass
+    return _cached_audio(*fallback)
+
 
-    # gTTS フォールバック（British English）
+def _generate(text, rate, lang, fetch):
+    """synthesize_to_cache() のパスを fetch(cache, path) で (値, MIMEタイプ) にする。失敗したら (None, "audio/mp3")"""
+    if not text or not text.strip():
+        return None, "audio/mp3"
     try:
-        from gtts import gTTS
-
-        tts_lang = "en-uk" if lang in ("en-GB", "en-uk") else "en"
-        tts = gTTS(text=text, lang=tts_lang, slow=(rate < 0.8))
-        audio_buffer = io.BytesIO()
-        tts.write_to_fp(audio_buffer)
-        audio_buffer.seek(0)
-        return base64.b64encode(audio_buffer.getvalue()).decode(), "audio/mp3"
+        # キャッシュ済みならすぐに、無ければ合成サービス（別プロセス）に頼んで待つ
+        path = tts_service.synthesize(text, rate, lang, priority=tts_service.INTERACTIVE)
+        return fetch(get_audio_cache(), path)
     except ImportError:
         _st().error("gTTS がインストールされていません。pip install gtts")
         return None, "audio/mp3"
@@ -107,18 +211,145 @@ def generate_audio_file(text: str, rate: float = 1.0, lang: str = "en") -> tuple
         return None, "audio/mp3"
 
 
+def generate_audio_file(text: str, rate: float = 1.0, lang: str = "en") -> tuple[str | None, str]:
+    """
+    サーバーで音声を生成し (Base64文字列, MIMEタイプ) で返す。
+    合成結果は (本文, エンジン, 声, 速度, 形式) をキーにディスクへ保存し、2 回目からはファイルを読むだけ。
+    """
+    def fetch(cache, path):
+        data, mime = cache.read(path)
+        return base64.b64encode(data).decode(), mime
+
+    return _generate(text, rate, lang, fetch)
+
+
+def generate_audio_url(text: str, rate: float = 1.0, lang: str = "en") -> tuple[str | None, str]:
+    """
+    サーバーで音声を生成し (URL, MIMEタイプ) で返す。
+    URL は static/audio/ のキャッシュファイル（内容で名前が決まる）を指すので、同じ文の 2 回目からは
+    ブラウザのキャッシュが効く。キャッシュが static/ の外なら data: URI を返す。
+    URL で再生できるのは、静的配信が音声の Content-Type を付ける Streamlit（requirements.txt の版）だけ。
+    """
+    def fetch(cache, path):
+        url = static_url(path)
+        if url is not None:
+            return url, MIME_TYPES[path.suffix[1:]]
+        data, mime = cache.read(path)
+        return f"data:{mime};base64,{base64.b64encode(data).decode()}", mime
+
+    return _generate(text, rate, lang, fetch)
+
+
+def _stream_player_html(stream_url):
+    """audio_stream の配信を、届いた区切りから順に続けて再生するプレーヤー"""
+    return f"""
+    <div style="margin: 10px 0;">
+        <audio id="player" controls autoplay style="width: 100%;"></audio>
+        <p id="status" style="font-size: 12px; color: #666; margin-top: 5px;">
+            🎵 サーバー生成音声 (British English)
+        </p>
+    </div>
+    <script>
+        const base = {json.dumps(stream_url)};
+        const player = document.getElementById("player");
+        const statusLine = document.getElementById("status");
+        let segments = [];
+        let done = false;
+        let index = 0;
+        let waiting = true;
+        const preloaded = {{}};
+
+        function preload(i) {{
+            if (i < segments.length && !preloaded[i]) {{
+                preloaded[i] = new Audio(base + segments[i]);
+                preloaded[i].preload = "auto";
+            }}
+        }}
+        function playCurrent() {{
+            waiting = false;
+            player.src = base + segments[index];
+            player.play().catch(() => {{}});
+            preload(index + 1);
+            statusLine.textContent = "🎵 サーバー生成音声 (British English) " + (index + 1) + "/" + (done ? segments.length : "…");
+        }}
+        player.addEventListener("ended", () => {{
+            if (index + 1 < segments.length) {{
+                index += 1;
+                playCurrent();
+            }} else if (!done) {{
+                index += 1;
+                waiting = true;
+            }}
+        }});
+        async function poll() {{
+            try {{
+                const response = await fetch(base + "index.json?t=" + Date.now(), {{cache: "no-store"}});
+                if (response.ok) {{
+                    const manifest = await response.json();
+                    segments = manifest.segments;
+                    done = manifest.done;
+                    if (manifest.error) statusLine.textContent = "⚠️ 音声生成エラー: " + manifest.error;
+                }}
+            }} catch (e) {{}}
+            if (waiting && index < segments.length) playCurrent();
+            preload(index + 1);
+            if (!done) setTimeout(poll, 250);
+        }}
+        poll();
+    </script>
+    """
+
+
+def _start_stream(text, rate, lang):
+    """
+    未合成の文の逐次配信を始め、最初の 1 文ができたら配信の URL を返す。配信しない・間に合わないときは None
+    合成サービスが有効なら、配信はタップの優先度の要求としてワーカーが行う（期限・キューの上限・
+    同じ文の先読みとのまとめも他の要求と同じ）。ENVOCAB_TTS_WORKERS=0 ならこのプロセスの裏のスレッドで配信する。
+    """
+    if tts_service.TTS_WORKERS <= 0:
+        stream = _open_piper_stream(text, rate)
+        return stream.url if stream is not None and stream.wait_first(FIRST_SEGMENT_TIMEOUT) else None
+    plan = _piper_stream(text, rate)
+    if plan is None:
+        return None
+    root = get_audio_cache().root
+    audio_stream.cleanup(root)
+    directory = audio_stream.stream_dir(root, plan[0])
+    future = tts_service.get_service().submit(text, rate, lang, tts_service.INTERACTIVE, stream=True)
+    deadline = time.monotonic() + FIRST_SEGMENT_TIMEOUT
+    while not future.done() and time.monotonic() < deadline:
+        index = audio_stream.read_index(directory)
+        # 失敗した前回の配信の index.json は使わない（ワーカーが始めると空の一覧で上書きされる）
+        if index and index["segments"] and not index["error"]:
+            return audio_stream.stream_url(directory)
+        time.sleep(STREAM_POLL_SECONDS)
+    # 先に始まっていた同じ文の合成（先読みなど）にまとまったときは、終わるのを待って通常の再生にする
+    return None
+
+
 def play_server_generated_audio(text: str, rate: float = 1.0) -> None:
-    """サーバー生成音声を再生（British English）。"""
+    """
+    サーバー生成音声を再生（British English）。音声は URL で渡し、iframe には埋め込まない。
+    Piper で未合成の文は 1 文ずつ配信し（audio_stream）、最初の 1 文ができた時点で再生を始める。
+    """
+    import html as html_module
     st = _st()
     with st.spinner("🎵 音声を生成中..."):
-        audio_base64, mime = generate_audio_file(text, rate, "en-uk")
-    if not audio_base64:
+        try:
+            stream_url = _start_stream(text, rate, "en-uk") if text and text.strip() else None
+        except Exception:
+            stream_url = None
+        if stream_url is not None:
+            st.components.v1.html(_stream_player_html(stream_url), height=80)
+            return
+        audio_url, mime = generate_audio_url(text, rate, "en-uk")
+    if not audio_url:
         st.error("音声生成に失敗しました")
         return
     audio_html = f"""
     <div style="margin: 10px 0;">
-        <audio controls autoplay style="width: 100%;">
-            <source src="data:{mime};base64,{audio_base64}" type="{mime}">
+        <audio controls autoplay preload="auto" style="width: 100%;">
+            <source src="{html_module.escape(audio_url)}" type="{mime}">
             Your browser does not support the audio element.
         </audio>
         <p style="font-size: 12px; color: #666; margin-top: 5px;">
@@ -0,0 +1,258 @@
+"""
+音声合成サービス（ワーカープロセスのプール）
+Piper の推論を Streamlit のスクリプトスレッドではなく別プロセスで行い、複数のコアを使う。
+要求は優先度付きのキューに入り、空いたワーカーに優先度の高い順（同じなら古い順）で渡す。
+  INTERACTIVE : 🔊 のタップ。先読みより先に処理する
+  PREFETCH    : 先読み（prefetch.py）
+同じ (文, 速度, 言語) の要求が待ち・処理中にあれば、新しく積まずにそれの結果を待つ（タップなら優先度を上げる）。
+要求には期限があり、期限までに処理が始まらなければ TimeoutError で捨てる。
+キューが TTS_QUEUE_SIZE 件で埋まっているときは、先読みは ServiceBusy で断り、タップは待ちの先読みを 1 件押し出す。
+ワーカーは合成結果を共有の音声キャッシュ（ディスク）に書き、ファイルのパスを返す。
+stream=True の要求は、ワーカーが 1 文ずつ配信用のファイル（audio_stream）に書きながら合成する（🔊 の逐次再生）。
+ENVOCAB_TTS_WORKERS=0 なら従来どおり呼び出したスレッドで合成する。
+"""
+import heapq
+import itertools
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import types
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+TTS_WORKERS = int(os.getenv("ENVOCAB_TTS_WORKERS", "2"))
+TTS_QUEUE_SIZE = int(os.getenv("ENVOCAB_TTS_QUEUE_SIZE", "64"))
+INTERACTIVE_TIMEOUT = float(os.getenv("ENVOCAB_TTS_TIMEOUT", "60"))
+PREFETCH_TIMEOUT = 300.0
+
+INTERACTIVE = 0
+PREFETCH = 1
+
+
+class ServiceBusy(RuntimeError):
+    """キューが埋まっていて要求を受け付けられない"""
+
+
+def _work(text, rate, lang, stream=False):
+    """ワーカープロセスで合成してキャッシュのファイルのパスを返す（stream なら 1 文ずつ配信しながら）"""
+    import tts
+
+    if stream:
+        return str(tts.stream_to_cache(text, rate, lang))
+    return str(tts.synthesize_to_cache(text, rate, lang))
+
+
+def _submit_to_pool(executor, fn, *args):
+    """
+    executor.submit。spawn のプールは submit のときにワーカーを起動し、ワーカーは親の __main__ を読み込み直す。
+    Streamlit は app.py を __main__ として実行しているので、起動の間だけ空の __main__ に差し替えて
+    ワーカーが画面のスクリプトを実行しないようにする。
+    """
+    main = sys.modules["__main__"]
+    placeholder = types.ModuleType("__main__")
+    sys.modules["__main__"] = placeholder
+    try:
+        return executor.submit(fn, *args)
+    finally:
+        # 差し替えている間に Streamlit が次の実行の __main__ を入れていたら、そちらを残す
+        if sys.modules["__main__"] is placeholder:
+            sys.modules["__main__"] = main
+
+
+class _Job:
+    __slots__ = ("key", "args", "priority", "seq", "deadline", "future", "running")
+
+    def __init__(self, key, args, priority, seq, deadline):
+        self.key = key
+        self.args = args
+        self.priority = priority
+        self.seq = seq
+        self.deadline = deadline
+        self.future = Future()
+        self.running = False
+
+
+class SynthesisService:
+    """優先度付きキューとワーカープロセスのプール（スレッドセーフ）。プールは最初の要求で作る"""
+
+    def __init__(self, workers=TTS_WORKERS, queue_size=TTS_QUEUE_SIZE, work=_work, clock=time.monotonic):
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self._work = work
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._heap = []  # (priority, seq, job)。優先度を上げたときは積み直し、古い方は取り出すときに捨てる
+        self._jobs = {}  # key -> 待ち・処理中の job
+        self._running = 0
+        self._seq = itertools.count()
+        self._executor = None
+        self._dispatcher = None
+        self.submitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.preempted = 0
+        self.expired = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _queued_locked(self):
+        return len(self._jobs) - self._running
+
+    def submit(self, text, rate=1.0, lang="en", priority=INTERACTIVE, timeout=None, stream=False):
+        """要求をキューに入れて Future（結果はキャッシュのファイルのパス）を返す。stream は _work を参照"""
+        if timeout is None:
+            timeout = INTERACTIVE_TIMEOUT if priority == INTERACTIVE else PREFETCH_TIMEOUT
+        key = (text.strip(), round(float(rate), 3), lang)
+        deadline = self._clock() + timeout
+        with self._cond:
+            job = self._jobs.get(key)
+            if job is not None:
+                self.coalesced += 1
+                job.deadline = max(job.deadline, deadline)
+                if stream and not job.running:
+                    job.args = (text, rate, lang, True)
+                if priority < job.priority and not job.running:
+                    job.priority = priority
+                    heapq.heappush(self._heap, (priority, job.seq, job))
+                    self._cond.notify()
+                return job.future
+            if self._queued_locked() >= self.queue_size:
+                self._make_room_locked(priority)
+            job = _Job(key, (text, rate, lang, stream), priority, next(self._seq), deadline)
+            self._jobs[key] = job
+            heapq.heappush(self._heap, (priority, job.seq, job))
+            self.submitted += 1
+            self._start_locked()
+            self._cond.notify()
+            return job.future
+
+    def _make_room_locked(self, priority):
+        """キューが満杯のとき、priority より低い待ちの要求のうち最も新しいものを押し出す。無ければ ServiceBusy"""
+        queued = [job for job in self._jobs.values() if not job.running and job.priority > priority]
+        if not queued:
+            self.rejected += 1
+            raise ServiceBusy("tts queue is full")
+        victim = max(queued, key=lambda job: (job.priority, job.seq))
+        del self._jobs[victim.key]
+        self.preempted += 1
+        victim.future.set_exception(ServiceBusy("preempted by a higher-priority request"))
+
+    def _start_locked(self):
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._dispatch, name="tts-dispatcher", daemon=True)
+            self._dispatcher.start()
+
+    def _next_job_locked(self):
+        while self._heap:
+            priority, _, job = heapq.heappop(self._heap)
+            if self._jobs.get(job.key) is not job or job.running or priority != job.priority:
+                continue  # 押し出し済み・積み直し前の古い項目
+            if job.deadline < self._clock():
+                del self._jobs[job.key]
+                self.expired += 1
+                job.future.set_exception(TimeoutError("tts request expired in the queue"))
+                continue
+            return job
+        return None
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                job = None
+                while job is None:
+                    while self._running >= self.workers or not self._heap:
+                        self._cond.wait()
+                    job = self._next_job_locked()
+                job.running = True
+                self._running += 1
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                executor = self._executor
+            try:
+                future = _submit_to_pool(executor, self._work, *job.args)
+            except RuntimeError as e:
+                # BrokenProcessPool か、終了処理でプールが閉じられた後（待っている呼び出し側をすぐ返す）
+                self._finish(job, executor, None, e)
+                continue
+            future.add_done_callback(lambda f, job=job, executor=executor: self._finish(job, executor, f))
+
+    def _finish(self, job, executor, future, error=None):
+        if future is not None:
+            try:
+                error = future.exception()
+            except CancelledError as e:
+                error = e
+        with self._cond:
+            self._running -= 1
+            if self._jobs.get(job.key) is job:
+                del self._jobs[job.key]
+            if isinstance(error, BrokenProcessPool) and self._executor is executor:
+                # ワーカーが落ちたらプールを作り直す（次の要求から）
+                self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            if error is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+            self._cond.notify()
+        if error is None:
+            job.future.set_result(Path(future.result()))
+        else:
+            job.future.set_exception(error)
+
+    def synthesize(self, text, rate=1.0, lang="en", priority=INTERACTIVE, timeout=None):
+        """合成して（キャッシュ済みならすぐに）キャッシュのファイルのパスを返す。期限切れは TimeoutError"""
+        if timeout is None:
+            timeout = INTERACTIVE_TIMEOUT if priority == INTERACTIVE else PREFETCH_TIMEOUT
+        future = self.submit(text, rate, lang, priority, timeout)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            raise TimeoutError("tts request did not finish before its deadline") from None
+
+    def stats(self):
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "queued": self._queued_locked(),
+                "running": self._running,
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "preempted": self.preempted,
+                "expired": self.expired,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+
+_lock = threading.Lock()
+_service = None
+
+
+def get_service():
+    """プロセス全体で 1 つの合成サービス"""
+    global _service
+    with _lock:
+        if _service is None:
+            _service = SynthesisService()
+        return _service
+
+
+def synthesize(text, rate=1.0, lang="en", priority=INTERACTIVE, timeout=None):
+    """音声を合成してキャッシュのファイルのパスを返す（ENVOCAB_TTS_WORKERS=0 ならこのスレッドで合成する）"""
+    import tts
+
+    if TTS_WORKERS <= 0:
+        return tts.synthesize_to_cache(text, rate, lang)
+    # キャッシュ済みならキューを通さずに返す
+    path = tts.get_audio_cache().path(tts.audio_cache_key(text, rate, lang))
+    if path is not None:
+        return path
+    return get_service().synthesize(text, rate, lang, priority, timeout)
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+def write_atomic(path, data, mode=0o644):
+    """
+    data を同じディレクトリの一時ファイル（.<ファイル名>.*）に書いてから path に置き換える。
+    読み手は書きかけのファイルを見ない。書き込みか置き換えに失敗したら一時ファイルを消して例外を投げ直す。
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class LRUCache:
+    """
+    サイズ上限付きの LRU キャッシュ（スレッドセーフ）
+    max_size は size_of(値) の合計の上限。size_of を省略すると件数で数える。
+    """
+
+    def __init__(self, max_size, size_of=None):
+        self.max_size = max_size
+        self._size_of = size_of or (lambda value: 1)
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self._size_of(value)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._items[key] = (value, size)
+            self.size += size
+            # 直前に入れた 1 件は上限を超えていても残す（単体で予算より大きいグループなど）
+            while self.size > self.max_size and len(self._items) > 1:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """キャッシュに無ければ loader() の結果を入れて返す"""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = loader()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def stats(self):
+        return {
+            "entries": len(self._items),
+            "size": self.size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,251 @@
+"""
+Piper 音声モデルのレジストリとプール
+voices/ の走査は起動後 1 回だけ行い、読み込んだ PiperVoice はプロセス全体（全セッション）で使い回す。
+プールは最大 VOICE_POOL_SIZE 個まで読み込み、貸し出し中でないものが
+VOICE_IDLE_SECONDS 使われなければ解放する（要求が来なくなっても裏のスレッドが解放する）。
+ENVOCAB_TTS_ENGINE=stub のときはモデル無しで動く StubVoice を使う（ベンチマーク・負荷試験用）。
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+VOICES_DIR = Path(__file__).resolve().parent / "voices"
+# en_GB の男性候補（この順で優先）
+PREFERRED_VOICES = ("northern_english_male", "alan", "aru")
+VOICE_POOL_SIZE = int(os.getenv("ENVOCAB_VOICE_POOL_SIZE", "2"))
+VOICE_IDLE_SECONDS = float(os.getenv("ENVOCAB_VOICE_IDLE_SECONDS", "600"))
+# 解放するスレッドが時計を見直す最長の間隔（秒）
+VOICE_REAP_INTERVAL = 60.0
+TTS_ENGINE = os.getenv("ENVOCAB_TTS_ENGINE", "piper")
+
+VoiceInfo = namedtuple("VoiceInfo", "name model_path config_path")
+STUB_VOICE = VoiceInfo("stub", "", "")
+
+
+def _config_for(onnx):
+    """model.onnx に対応する設定ファイル（model.onnx.json か model.json）"""
+    for candidate in (Path(str(onnx) + ".json"), onnx.with_suffix(".json")):
+        if candidate.exists():
+            return str(candidate)
+    return None
+
+
+class VoiceRegistry:
+    """voices/（と PIPER_VOICE_PATH）にある音声モデルの一覧。作成時に 1 回だけ走査する"""
+
+    def __init__(self, voices_dir=VOICES_DIR, env_path=None):
+        self.voices = {}
+        self.env_voice = None
+        if env_path:
+            onnx = Path(env_path)
+            if onnx.with_suffix(".onnx").exists():
+                onnx = onnx.with_suffix(".onnx")
+            config = _config_for(onnx) if onnx.exists() else None
+            if config:
+                self.env_voice = VoiceInfo(onnx.stem, str(onnx), config)
+        if Path(voices_dir).exists():
+            for onnx in sorted(Path(voices_dir).rglob("*.onnx")):
+                config = _config_for(onnx)
+                if config:
+                    self.voices[onnx.stem] = VoiceInfo(onnx.stem, str(onnx), config)
+
+    def __len__(self):
+        return len(self.voices) + (self.env_voice is not None)
+
+    def get(self, name):
+        if self.env_voice is not None and self.env_voice.name == name:
+            return self.env_voice
+        return self.voices.get(name)
+
+    def default(self):
+        """PIPER_VOICE_PATH の音声、無ければ PREFERRED_VOICES の順で最初に見つかった en_GB 男性の音声"""
+        if self.env_voice is not None:
+            return self.env_voice
+        for preferred in PREFERRED_VOICES:
+            for name, info in self.voices.items():
+                if preferred in name:
+                    return info
+        return None
+
+
+class StubVoice:
+    """
+    モデルファイル無しで動く試験用の音声（PiperVoice と同じ呼び出し方）
+    読み込みに load_seconds、1 文字あたり seconds_per_char かかるものとして待ち、
+    文字数に比例した長さの正弦波（16bit モノラル）を返す。
+    """
+
+    class config:
+        sample_rate = 22050
+
+    def __init__(self, load_seconds=0.0, seconds_per_char=0.0, samples_per_char=1200):
+        time.sleep(load_seconds)
+        self.seconds_per_char = seconds_per_char
+        self.samples_per_char = samples_per_char
+
+    def synthesize_stream_raw(self, text, sentence_silence=0.0, length_scale=None):
+        scale = length_scale or 1.0
+        for sentence in filter(None, (s.strip() for s in text.replace("!", ".").replace("?", ".").split("."))):
+            time.sleep(self.seconds_per_char * len(sentence))
+            count = int(self.samples_per_char * len(sentence) * scale)
+            wave = 8000 * np.sin(2 * np.pi * 220 * np.arange(count) / self.config.sample_rate)
+            yield wave.astype("<i2").tobytes()
+
+
+def load_voice(info):
+    """音声モデルを読み込む（重い。VoicePool 経由で呼ぶ）"""
+    if info.name == STUB_VOICE.name:
+        return StubVoice(
+            load_seconds=float(os.getenv("ENVOCAB_STUB_LOAD_SECONDS", "0.5")),
+            seconds_per_char=float(os.getenv("ENVOCAB_STUB_SECONDS_PER_CHAR", "0.0002")),
+        )
+    from piper import PiperVoice
+
+    return PiperVoice.load(info.model_path, config_path=info.config_path)
+
+
+class VoicePool:
+    """
+    読み込み済み音声のプール（スレッドセーフ）
+    checkout() で 1 つ借りて with を抜けると返す。同じ音声の空きがあればそれを、
+    無ければ上限 size まで新しく読み込み、上限なら別の音声の空きを追い出すか返却を待つ。
+    空きがある間は裏のスレッド（voice-reaper）が idle_seconds 使われていないものを解放し、空きが無くなると終わる。
+    """
+
+    def __init__(self, loader=load_voice, size=VOICE_POOL_SIZE, idle_seconds=VOICE_IDLE_SECONDS, clock=time.monotonic,
+                 reap_interval=VOICE_REAP_INTERVAL):
+        self._loader = loader
+        self.size = max(1, size)
+        self.idle_seconds = idle_seconds
+        self.reap_interval = reap_interval
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._idle = []  # [(info, voice, 返却時刻)]
+        self._count = 0  # 読み込み済み（読み込み中を含む）の数
+        self._reaper = None
+        self.loads = 0
+        self.reuses = 0
+        self.waits = 0
+        self.evictions = 0
+
+    def _evict_idle_locked(self):
+        now = self._clock()
+        keep = [entry for entry in self._idle if now - entry[2] < self.idle_seconds]
+        self.evictions += len(self._idle) - len(keep)
+        self._count -= len(self._idle) - len(keep)
+        self._idle = keep
+
+    def _start_reaper_locked(self):
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap, name="voice-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap(self):
+        """空きの音声が無くなるまで、いちばん古い空きが期限を迎えるたびに解放する"""
+        with self._cond:
+            while True:
+                self._evict_idle_locked()
+                if not self._idle:
+                    self._reaper = None
+                    return
+                expires = min(entry[2] for entry in self._idle) + self.idle_seconds
+                self._cond.wait(min(max(expires - self._clock(), 0.0), self.reap_interval))
+
+    @contextmanager
+    def checkout(self, info, timeout=None):
+        deadline = None if timeout is None else self._clock() + timeout
+        voice = None
+        with self._cond:
+            self._evict_idle_locked()
+            while True:
+                for i, (idle_info, idle_voice, _) in enumerate(self._idle):
+                    if idle_info == info:
+                        voice = idle_voice
+                        del self._idle[i]
+                        self.reuses += 1
+                        break
+                if voice is not None:
+                    break
+                if self._count < self.size:
+                    self._count += 1
+                    break
+                if self._idle:
+                    # 上限に達していれば、いちばん長く使われていない別の音声を追い出して枠を空ける
+                    self._idle.pop(0)
+                    self.evictions += 1
+                    break
+                remaining = None if deadline is None else deadline - self._clock()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("no voice available in the pool")
+                self.waits += 1
+                self._cond.wait(remaining)
+
+        if voice is None:
+            try:
+                voice = self._loader(info)
+            except BaseException:
+                with self._cond:
+                    self._count -= 1
+                    self._cond.notify_all()
+                raise
+            with self._cond:
+                self.loads += 1
+        try:
+            yield voice
+        finally:
+            with self._cond:
+                self._idle.append((info, voice, self._clock()))
+                self._start_reaper_locked()
+                # 返却を待つ checkout と voice-reaper が同じ条件変数で待つので、全員を起こす
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "loaded": self._count,
+                "idle": len(self._idle),
+                "size": self.size,
+                "loads": self.loads,
+                "reuses": self.reuses,
+                "waits": self.waits,
+                "evictions": self.evictions,
+            }
+
+
+_lock = threading.Lock()
+_registry = None
+_pool = None
+
+
+def get_registry():
+    """プロセス全体で 1 つのレジストリ（初回だけ voices/ を走査する）"""
+    global _registry
+    with _lock:
+        if _registry is None:
+            _registry = VoiceRegistry(env_path=os.getenv("PIPER_VOICE_PATH", "").strip() or None)
+        return _registry
+
+
+def get_pool():
+    """プロセス全体で 1 つの音声プール"""
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = VoicePool()
+        return _pool
+
+
+def default_voice():
+    """使う音声（stub エンジンなら STUB_VOICE、Piper が使えなければ None）"""
+    if TTS_ENGINE == "stub":
+        return STUB_VOICE
+    try:
+        import piper  # noqa: F401
+    except ImportError:
+        return None
+    return get_registry().default()